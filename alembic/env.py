@@ -25,6 +25,19 @@ if config.config_file_name is not None:
 # Set metadata for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Database-only objects kept off the models on purpose (Postgres search and trigram
+# support, see app/search.py and crud.suggest_values); autogenerate must not drop them
+UNMANAGED_OBJECTS = {
+    "search_vector",
+    "ix_applications_search_vector",
+    "ix_applications_company_trgm",
+    "ix_applications_role_title_trgm",
+}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and name in UNMANAGED_OBJECTS)
+
 
 def run_migrations_offline():
     """Run migrations in 'offline' mode."""
@@ -32,6 +45,7 @@ def run_migrations_offline():
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -51,7 +65,8 @@ def run_migrations_online():
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,33 @@
+"""applications keyset pagination index
+
+Revision ID: 20ba9b9e90c7
+Revises: 102ee8be841f
+Create Date: 2026-10-17 09:12:04.318822
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20ba9b9e90c7'
+down_revision: Union[str, Sequence[str], None] = '102ee8be841f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_applications_user_created_id',
+        'applications',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_applications_user_created_id', table_name='applications')
@@ -0,0 +1,47 @@
+"""applications full-text search vector
+
+Revision ID: 86fa426b8409
+Revises: c70edb692185
+Create Date: 2026-10-17 14:02:51.417390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '86fa426b8409'
+down_revision: Union[str, Sequence[str], None] = 'c70edb692185'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Generated column: Postgres keeps it current on every write, no triggers needed.
+    # Weights rank company hits above role_title above notes (see app/search.py).
+    op.execute(
+        """
+        ALTER TABLE applications ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(company, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(role_title, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(notes, '')), 'C')
+        ) STORED
+        """
+    )
+    op.create_index(
+        'ix_applications_search_vector',
+        'applications',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_applications_search_vector', table_name='applications')
+    op.drop_column('applications', 'search_vector')
@@ -0,0 +1,70 @@
+"""applications dedupe and idempotency keys
+
+Revision ID: b29c0c1785ee
+Revises: fe0852c1d21e
+Create Date: 2026-10-17 16:48:33.102684
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b29c0c1785ee'
+down_revision: Union[str, Sequence[str], None] = 'fe0852c1d21e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _dedupe_key(company: str, role_title: str) -> str:
+    # Mirrors app.crud.application_dedupe_key
+    normalized = "\x1f".join(" ".join(value.split()).casefold() for value in (company, role_title))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _backfill_dedupe_keys(conn) -> None:
+    # The oldest application of each normalized (company, role_title) per user claims
+    # the key; later copies keep NULL, as crud.create_application does for them.
+    applications = sa.table(
+        'applications',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+        sa.column('company', sa.String), sa.column('role_title', sa.String),
+        sa.column('dedupe_key', sa.String),
+    )
+    rows = conn.execute(
+        sa.select(applications.c.id, applications.c.user_id, applications.c.company, applications.c.role_title)
+        .order_by(applications.c.id)
+    )
+    claimed = set()
+    updates = []
+    for app_id, user_id, company, role_title in rows:
+        key = _dedupe_key(company, role_title)
+        if (user_id, key) in claimed:
+            continue
+        claimed.add((user_id, key))
+        updates.append({'b_id': app_id, 'b_key': key})
+    update = applications.update().where(applications.c.id == sa.bindparam('b_id')).values(dedupe_key=sa.bindparam('b_key'))
+    for start in range(0, len(updates), 5000):
+        conn.execute(update, updates[start:start + 5000])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('applications', sa.Column('dedupe_key', sa.String(length=64), nullable=True))
+    op.add_column('applications', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    # Reads existing rows, so there is nothing to emit when only generating SQL (--sql)
+    if not op.get_context().as_sql:
+        _backfill_dedupe_keys(op.get_bind())
+    op.create_index('ux_applications_user_dedupe_key', 'applications', ['user_id', 'dedupe_key'], unique=True)
+    op.create_index('ux_applications_user_idempotency_key', 'applications', ['user_id', 'idempotency_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_applications_user_idempotency_key', table_name='applications')
+    op.drop_index('ux_applications_user_dedupe_key', table_name='applications')
+    op.drop_column('applications', 'idempotency_key')
+    op.drop_column('applications', 'dedupe_key')
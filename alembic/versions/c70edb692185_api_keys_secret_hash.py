@@ -0,0 +1,56 @@
+"""api_keys secret_hash
+
+Revision ID: c70edb692185
+Revises: dfeed549cc60
+Create Date: 2026-10-17 13:05:52.640117
+
+"""
+from typing import Sequence, Union
+import hashlib
+import hmac
+
+from alembic import op
+import sqlalchemy as sa
+from cryptography.fernet import Fernet, InvalidToken
+
+from app.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c70edb692185'
+down_revision: Union[str, Sequence[str], None] = 'dfeed549cc60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('api_keys', sa.Column('secret_hash', sa.String(length=64), nullable=True))
+
+    # Backfill: decrypt each stored secret once and store its peppered HMAC.
+    # Mirrors app.auth.hash_secret; rows that cannot be decrypted keep NULL and
+    # are still verified through the decrypt fallback in require_api_key.
+    if not settings.API_KEY_ENC_SECRET:
+        return
+    fernet = Fernet(settings.API_KEY_ENC_SECRET.encode())
+    pepper = (settings.API_KEY_PEPPER or settings.API_KEY_ENC_SECRET).encode()
+    conn = op.get_bind()
+    api_keys = sa.table('api_keys', sa.column('id', sa.Integer), sa.column('secret_enc', sa.String), sa.column('secret_hash', sa.String))
+    rows = conn.execute(sa.select(api_keys.c.id, api_keys.c.secret_enc).where(api_keys.c.secret_hash.is_(None))).all()
+    updates = []
+    for key_id, secret_enc in rows:
+        try:
+            secret = fernet.decrypt(secret_enc.encode())
+        except InvalidToken:
+            continue
+        updates.append({'b_id': key_id, 'b_hash': hmac.new(pepper, secret, hashlib.sha256).hexdigest()})
+    if updates:
+        conn.execute(
+            api_keys.update().where(api_keys.c.id == sa.bindparam('b_id')).values(secret_hash=sa.bindparam('b_hash')),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('api_keys', 'secret_hash')
@@ -0,0 +1,40 @@
+"""application_status_counts summary table
+
+Revision ID: dfeed549cc60
+Revises: 20ba9b9e90c7
+Create Date: 2026-10-17 10:41:27.902151
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dfeed549cc60'
+down_revision: Union[str, Sequence[str], None] = '20ba9b9e90c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('application_status_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM('APPLIED', 'INTERVIEWING', 'REJECTED', 'OFFER', 'ARCHIVED', name='applicationstatus', create_type=False), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'status')
+    )
+    # Backfill from existing applications (same as `python -m app.maintenance rebuild-status-counts`)
+    op.execute(
+        "INSERT INTO application_status_counts (user_id, status, total) "
+        "SELECT user_id, status, count(*) FROM applications GROUP BY user_id, status"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('application_status_counts')
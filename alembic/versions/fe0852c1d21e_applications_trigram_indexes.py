@@ -0,0 +1,45 @@
+"""applications trigram indexes for autocomplete
+
+Revision ID: fe0852c1d21e
+Revises: 86fa426b8409
+Create Date: 2026-10-17 15:26:09.553201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fe0852c1d21e'
+down_revision: Union[str, Sequence[str], None] = '86fa426b8409'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Serve lower(column) LIKE '...%' / '% ...%' lookups from crud.suggest_values;
+    # plain B-tree indexes cannot answer case-insensitive infix matches
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_applications_company_trgm',
+        'applications',
+        [sa.text('lower(company) gin_trgm_ops')],
+        unique=False,
+        postgresql_using='gin',
+    )
+    op.create_index(
+        'ix_applications_role_title_trgm',
+        'applications',
+        [sa.text('lower(role_title) gin_trgm_ops')],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_applications_role_title_trgm', table_name='applications')
+    op.drop_index('ix_applications_company_trgm', table_name='applications')
@@ -1,16 +1,23 @@
 import hmac, hashlib, secrets, time
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from fastapi import Header, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from cryptography.fernet import Fernet
 from app.config import settings
 from app.models_apikeys import ApiKey
 from app.models import User
-from app.db import get_db
-from sqlalchemy import select, update
-from starlette.middleware.base import BaseHTTPMiddleware
+from app.db import get_async_db
+from sqlalchemy import select
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi import Depends
-from datetime import datetime
+from dataclasses import dataclass
+from app.cache import api_key_cache
+from app import crud
+from app.replay import replay_guard
+from app.metrics import AUTH_FAILURES
+from app.timing import phase, timed
 
 # Initialize Fernet with secret (or generate if not provided)
 FERNET = Fernet(
@@ -34,16 +41,48 @@ def decrypt_secret(secret_enc: str) -> str:
     """Decrypt the secret from storage"""
     return FERNET.decrypt(secret_enc.encode()).decode()
 
+# Server-side pepper for secret hashes; falls back like FERNET does when unset
+PEPPER = (
+    (settings.API_KEY_PEPPER or settings.API_KEY_ENC_SECRET).encode()
+    or secrets.token_bytes(32)
+)
+
+def hash_secret(secret: str) -> str:
+    """Keyed hash of the secret for storage and constant-time verification"""
+    return hmac.new(PEPPER, secret.encode(), hashlib.sha256).hexdigest()
+
+def auth_failure(status_code: int, detail: str) -> HTTPException:
+    """Count a rejected auth/signature check by reason and build its HTTP error"""
+    AUTH_FAILURES.labels(reason=detail).inc()
+    return HTTPException(status_code=status_code, detail=detail)
+
+@dataclass(frozen=True)
+class CachedApiKey:
+    """Verified key state kept in ``api_key_cache`` (no plaintext secret)"""
+    user_id: int
+    key_id: int
+    secret_hash: str
+
+@dataclass(frozen=True)
+class ApiKeyPrincipal:
+    """Authenticated caller, as returned by ``require_api_key``"""
+    user_id: int
+    key_id: int
+    prefix: str
+    secret: str  # presented secret, already verified against storage
+
+@timed("auth")
 async def require_api_key(
     x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
-    db: Session = Depends(get_db),
-) -> Tuple[User, ApiKey, str]:
+    db: AsyncSession = Depends(get_async_db),
+) -> ApiKeyPrincipal:
     """
     Dependency to authenticate requests using API key.
-    Returns (User, ApiKey, secret) tuple.
+    Secrets are checked against a peppered HMAC; verified keys are cached by prefix,
+    so repeat calls skip the DB lookups entirely.
     """
     if not x_api_key or not x_api_key.startswith("ak_") or "." not in x_api_key:
-        raise HTTPException(
+        raise auth_failure(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing or invalid API key"
         )
@@ -52,54 +91,84 @@ async def require_api_key(
         _, rest = x_api_key.split("ak_", 1)
         prefix, provided_secret = rest.split(".", 1)
     except Exception:
-        raise HTTPException(
+        raise auth_failure(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key format"
         )
     
-    # Find API key by prefix
-    ak = db.scalar(
-        select(ApiKey).where(
-            ApiKey.prefix == prefix, 
-            ApiKey.is_active == True
+    provided_hash = hash_secret(provided_secret)
+    cached = api_key_cache.get(prefix)
+    if cached is None:
+        # Read before the DB: a revocation committed during this lookup must win
+        generation = api_key_cache.generation
+        # Find API key by prefix
+        ak = await db.scalar(
+            select(ApiKey).where(
+                ApiKey.prefix == prefix, 
+                ApiKey.is_active == True
+            )
         )
-    )
-    
-    if not ak:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="API key not found"
-        )
-    
-    # Verify secret
-    real_secret = decrypt_secret(ak.secret_enc)
-    if not hmac.compare_digest(real_secret, provided_secret):
-        raise HTTPException(
+        
+        if not ak:
+            raise auth_failure(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API key not found"
+            )
+        
+        # Verify secret; keys created before secret_hash existed fall back to decrypting
+        if ak.secret_hash:
+            secret_ok = hmac.compare_digest(ak.secret_hash, provided_hash)
+        else:
+            with phase("decrypt"):
+                secret_ok = hmac.compare_digest(decrypt_secret(ak.secret_enc), provided_secret)
+        if not secret_ok:
+            raise auth_failure(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API key mismatch"
+            )
+        
+        # Get user
+        user = await db.get(User, ak.user_id)
+        if not user:
+            raise auth_failure(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found for API key"
+            )
+        
+        cached = CachedApiKey(user_id=user.id, key_id=ak.id, secret_hash=provided_hash)
+        api_key_cache.set(prefix, cached, if_generation=generation)
+    elif not hmac.compare_digest(cached.secret_hash, provided_hash):
+        raise auth_failure(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key mismatch"
         )
     
-    # Get user
-    user = db.get(User, ak.user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found for API key"
-        )
+    # Update last used timestamp (batched, no write on the request path)
+    await crud.update_last_used(key_id=cached.key_id)
     
-    # Update last used timestamp
-    db.execute(
-        update(ApiKey)
-        .where(ApiKey.id == ak.id)
-        .values(last_used_at=datetime.utcnow())
+    return ApiKeyPrincipal(
+        user_id=cached.user_id,
+        key_id=cached.key_id,
+        prefix=prefix,
+        secret=provided_secret,
     )
-    db.commit()
-    
-    return user, ak, real_secret
 
+async def require_internal_key(api: ApiKeyPrincipal = Depends(require_api_key)) -> ApiKeyPrincipal:
+    """
+    Dependency for operational endpoints: the caller's key must be allowlisted in
+    INTERNAL_API_KEY_PREFIXES, since their data spans every tenant.
+    """
+    if api.prefix not in settings.INTERNAL_API_KEY_PREFIXES:
+        raise auth_failure(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="API key not allowed for internal endpoints"
+        )
+    return api
+
+@timed("signature")
 async def verify_signature_if_present(
     request: Request,
-    api: Tuple[User, ApiKey, str] = Depends(require_api_key),
+    api: ApiKeyPrincipal = Depends(require_api_key),
     x_timestamp: Optional[str] = Header(default=None, alias="X-Timestamp"),
     x_signature: Optional[str] = Header(default=None, alias="X-Signature"),
 ):
@@ -109,7 +178,7 @@ async def verify_signature_if_present(
     - X-Timestamp: Unix seconds
     - X-Signature: hex(HMAC_SHA256(secret, f"{method}\n{path}\n{timestamp}\n{body}"))
     """
-    user, ak, secret = api
+    secret = api.secret
     
     # Skip if no signature headers
     if not x_signature and not x_timestamp:
@@ -119,36 +188,154 @@ async def verify_signature_if_present(
     try:
         ts = int(x_timestamp or "0")
     except ValueError:
-        raise HTTPException(
+        raise auth_failure(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid X-Timestamp"
         )
     
     # Check for stale requests (5 minutes tolerance)
-    if abs(int(time.time()) - ts) > 300:
-        raise HTTPException(
+    if abs(int(time.time()) - ts) > settings.SIGNATURE_TOLERANCE_SECONDS:
+        raise auth_failure(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Stale request"
         )
     
-    # Verify signature
-    body_bytes = await request.body()
-    to_sign = f"{request.method}\n{request.url.path}\n{ts}\n".encode() + body_bytes
-    expected = hmac.new(
-        secret.encode(), 
-        to_sign, 
-        hashlib.sha256
-    ).hexdigest()
+    # Verify signature. SignatureCaptureMiddleware hashes the body while it streams in;
+    # routes without a body parameter have not read it yet, so drain it here.
+    capture: Optional[BodyCapture] = getattr(request.state, "signature_capture", None)
+    if capture is not None and capture.mac is not None:
+        if not capture.done:
+            await request.body()
+        expected = capture.digest
+    else:
+        body_bytes = await request.body()
+        to_sign = signing_prefix(request.method, request.url.path, ts) + body_bytes
+        expected = hmac.new(
+            secret.encode(), 
+            to_sign, 
+            hashlib.sha256
+        ).hexdigest()
     
     if not hmac.compare_digest(expected, (x_signature or "")):
-        raise HTTPException(
+        raise auth_failure(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Bad signature"
         )
+    
+    # Only valid signatures are remembered, so bad requests cannot poison the store
+    with phase("replay"):
+        first_use = await replay_guard.first_use(api.prefix, x_signature, ts + settings.SIGNATURE_TOLERANCE_SECONDS)
+    if not first_use:
+        raise auth_failure(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Replayed request"
+        )
+
+class BodyCapture:
+    """Incremental HMAC of a signed request body, stored on ``request.state.signature_capture``"""
+    __slots__ = ("mac", "done", "digest")
+
+    def __init__(self, mac: Optional["hmac.HMAC"]):
+        self.mac = mac
+        self.done = False
+        self.digest: Optional[str] = None
+
+    def update(self, chunk: bytes, more_body: bool) -> None:
+        if self.mac is not None:
+            self.mac.update(chunk)
+            if not more_body:
+                self.digest = self.mac.hexdigest()
+        if not more_body:
+            self.done = True
+
+def signing_prefix(method: str, path: str, ts: int) -> bytes:
+    """Bytes signed ahead of the body: method, path and timestamp, newline-separated"""
+    return f"{method}\n{path}\n{ts}\n".encode()
+
+def _start_signature_mac(scope, headers: Headers) -> Optional["hmac.HMAC"]:
+    """
+    HMAC keyed with the secret presented in X-API-Key, for requests carrying X-Signature.
+    require_api_key later checks that secret against storage, so the digest is only
+    trusted once the key itself has been verified.
+    """
+    api_key = headers.get("x-api-key")
+    if not headers.get("x-signature") or not api_key or not api_key.startswith("ak_") or "." not in api_key:
+        return None
+    try:
+        ts = int(headers.get("x-timestamp") or "0")
+    except ValueError:
+        return None
+    secret = api_key[3:].split(".", 1)[1]
+    return hmac.new(secret.encode(), signing_prefix(scope["method"], scope["path"], ts), hashlib.sha256)
+
+class SignatureCaptureMiddleware:
+    """
+    Pure ASGI middleware that enforces MAX_REQUEST_BODY_BYTES and, for signed requests,
+    hashes the body incrementally as the app reads it (no second full-body copy).
+    A declared Content-Length is checked up front (the server caps the body at it);
+    chunked bodies are read here, up to the limit, before the app sees any of them.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: Optional[int] = None):
+        self.app = app
+        self.max_body_bytes = max_body_bytes if max_body_bytes is not None else settings.MAX_REQUEST_BODY_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = Headers(scope=scope)
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit():
+            if int(content_length) > self.max_body_bytes:
+                await self._too_large(scope, receive, send)
+                return
+        else:
+            buffered = await self._read_body(receive)
+            if buffered is None:
+                await self._too_large(scope, receive, send)
+                return
+            receive = self._replay(buffered, receive)
+        
+        capture = BodyCapture(_start_signature_mac(scope, headers))
+        scope.setdefault("state", {})["signature_capture"] = capture
+        
+        async def capture_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                capture.update(message.get("body", b""), message.get("more_body", False))
+            return message
+        
+        await self.app(scope, capture_receive, send)
+
+    async def _read_body(self, receive: Receive) -> Optional[List[Message]]:
+        """Body messages of a request without Content-Length; None as soon as it exceeds the limit"""
+        messages: List[Message] = []
+        received = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                return messages
+            received += len(message.get("body", b""))
+            if received > self.max_body_bytes:
+                # Stop reading: the rest of the body is never pulled off the connection
+                return None
+            if not message.get("more_body", False):
+                return messages
+
+    @staticmethod
+    def _replay(messages: List[Message], receive: Receive) -> Receive:
+        pending = iter(messages)
+        
+        async def replay_receive() -> Message:
+            message = next(pending, None)
+            return message if message is not None else await receive()
+        
+        return replay_receive
 
-class SignatureCaptureMiddleware(BaseHTTPMiddleware):
-    """Middleware for capturing signatures (placeholder for future use)"""
-    async def dispatch(self, request: Request, call_next):
-        # No-op placeholder; kept for future logging/body replay handling
-        response = await call_next(request)
-        return response
\ No newline at end of file
+    @staticmethod
+    async def _too_large(scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+        await response(scope, receive, send)
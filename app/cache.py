@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from app.config import settings
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries also expire after ``ttl`` seconds.
+    Keeps hit/miss/eviction counters so callers can expose them.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Bumped by every invalidate()/clear(); see set(if_generation=...)
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get(), but without touching LRU order or the hit/miss counters"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, *, if_generation: Optional[int] = None) -> None:
+        """
+        Insert or replace an entry, evicting least recently used ones over maxsize.
+        With ``if_generation`` (``generation`` read before loading the value), the value is
+        dropped if anything was invalidated meanwhile, so a load racing an invalidation
+        cannot resurrect the stale entry.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if if_generation is not None and if_generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop an entry immediately (e.g. after a write that changes it)"""
+        with self._lock:
+            self.generation += 1
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the cache counters"""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+# Verified API key state keyed by prefix. Values never contain the plaintext secret.
+api_key_cache = TTLCache(
+    maxsize=settings.API_KEY_CACHE_MAX_SIZE,
+    ttl=settings.API_KEY_CACHE_TTL_SECONDS,
+)
+
+# Exact application totals keyed by (user_id, status, listing version); a write moves the version on
+count_cache = TTLCache(
+    maxsize=settings.COUNT_CACHE_MAX_SIZE,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+# Per-user autocomplete indexes keyed by (user_id, field); updated in place on creates
+suggest_cache = TTLCache(
+    maxsize=settings.SUGGEST_CACHE_MAX_SIZE,
+    ttl=settings.SUGGEST_CACHE_TTL_SECONDS,
+)
+
+# Stored POST responses keyed by hash(caller, Idempotency-Key, method, path) when Redis is absent
+idempotency_cache = TTLCache(
+    maxsize=settings.IDEMPOTENCY_CACHE_MAX_SIZE,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+)
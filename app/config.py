@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Dict, List, Literal
 
 class Settings(BaseSettings):
     # Environment settings
@@ -12,11 +13,79 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "db"
     POSTGRES_PORT: str = "5432"
     
+    # SQLite file used in local/test mode (benchmarks point this elsewhere)
+    SQLITE_PATH: str = "./test.db"
+    
+    # Connection pool (per engine, per worker process). Size the total
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW) * engines * workers against Postgres max_connections.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds; -1 disables
+    # "always": SELECT 1 on every checkout; "never": rely on recycle and disconnect invalidation
+    DB_POOL_PRE_PING: Literal["always", "never"] = "always"
+    
     # Redis settings (for rate limiting)
     REDIS_URL: str = "redis://redis:6379/0"
     
+    # Rate limiting: token bucket per API key prefix ("times/seconds" overrides by prefix)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_TIMES: int = 60
+    RATE_LIMIT_SECONDS: int = 60
+    RATE_LIMIT_OVERRIDES: Dict[str, str] = Field(default_factory=dict)
+    
     # API key encryption secret
     API_KEY_ENC_SECRET: str = Field(default="")
+    # Pepper for stored API key secret hashes (defaults to API_KEY_ENC_SECRET)
+    API_KEY_PEPPER: str = Field(default="")
+    
+    # API key prefixes allowed to read /internal/* (pool, cache and slow-query stats);
+    # empty means no key can, e.g. INTERNAL_API_KEY_PREFIXES='["AbCdEf012345"]'
+    INTERNAL_API_KEY_PREFIXES: List[str] = Field(default_factory=list)
+    
+    # Signed requests: accepted clock skew, and bucket size of the in-memory replay store
+    SIGNATURE_TOLERANCE_SECONDS: int = 300
+    REPLAY_BUCKET_SECONDS: int = 10
+    
+    # Verified API key cache (per process; revocations are broadcast to all workers over Redis)
+    API_KEY_CACHE_TTL_SECONDS: int = 60
+    API_KEY_CACHE_MAX_SIZE: int = 10_000
+    
+    # Cached exact application totals (per process, keyed by the listing version behind ETags)
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    COUNT_CACHE_MAX_SIZE: int = 10_000
+    
+    # Autocomplete indexes per (user, field); users with more distinct values than
+    # SUGGEST_CACHE_MAX_VALUES are answered from the trigram indexes instead
+    SUGGEST_CACHE_TTL_SECONDS: int = 300
+    SUGGEST_CACHE_MAX_SIZE: int = 2_000
+    SUGGEST_CACHE_MAX_VALUES: int = 20_000
+    
+    # Maximum items accepted by POST /api/applications/bulk
+    BULK_IMPORT_MAX_ITEMS: int = 2000
+    
+    # Requests with larger bodies are rejected with 413 before being buffered
+    MAX_REQUEST_BODY_BYTES: int = 4 * 1024 * 1024
+    
+    # Idempotency-Key response cache for POST requests: how long responses are replayed,
+    # how long a duplicate waits for the first request, and the largest body stored
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_LOCK_SECONDS: int = 30
+    IDEMPOTENCY_CACHE_MAX_SIZE: int = 10_000
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 1024 * 1024
+    
+    # Write-behind api_keys.last_used_at: flush every N seconds or N pending keys
+    LAST_USED_FLUSH_INTERVAL_SECONDS: float = 5.0
+    LAST_USED_FLUSH_MAX_KEYS: int = 500
+    
+    # Fraction of requests (0.0-1.0) that get a Server-Timing breakdown; 0 disables it entirely
+    SERVER_TIMING_SAMPLE_RATE: float = Field(default=0.0, ge=0.0, le=1.0)
+    
+    # Query log: statements slower than the threshold are logged; requests issuing
+    # more than QUERY_COUNT_WARN_THRESHOLD statements are flagged as possible N+1
+    QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    QUERY_COUNT_WARN_THRESHOLD: int = 10
     
     @property
     def DATABASE_URL(self) -> str:
@@ -26,5 +95,13 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """Construct asyncpg database URL for the async engine"""
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        )
+
 # Create settings instance that reads from environment variables
 settings = Settings()
\ No newline at end of file
@@ -1,29 +1,53 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func, desc, update
-from typing import List, Optional, Tuple
-from app.models import User, Application, ApplicationStatus
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ClauseElement, Executable, Row, Select, insert, select, func, desc, or_, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import Counter, defaultdict
+from app.config import settings
+from app.models import User, Application, ApplicationStatus, ApplicationStatusCount
 from app.models_apikeys import ApiKey
+from app.cache import count_cache, suggest_cache
+from app.etag import listing_versions
+from app.last_used import last_used_tracker
+from app.pagination import encode_cursor
+from app.revocations import revocations
+from app.search import apply_search
+from app.suggest import TOO_MANY_VALUES, SuggestionIndex
 
 # ===== USER CRUD OPERATIONS =====
-def create_user(db: Session, *, email: str, full_name: Optional[str]) -> User:
-    """Create a new user in the database"""
-    user = User(email=email, full_name=full_name)
-    db.add(user)      # Add to session
-    db.commit()       # Commit transaction to DB
-    db.refresh(user)  # Refresh to get DB-generated values (like ID)
+async def create_user(db: AsyncSession, *, email: str, full_name: Optional[str]) -> Optional[User]:
+    """
+    Create a new user in one INSERT ... ON CONFLICT (email) DO NOTHING RETURNING.
+    Returns None if the email is taken; the unique index decides, so concurrent sign-ups
+    cannot both pass a check and then fail on commit.
+    """
+    stmt = (
+        _dialect_insert(db)(User)
+        .values(email=email, full_name=full_name)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+    user = await db.scalar(stmt)
+    await db.commit()
     return user
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
-    """Get user by email address"""
-    return db.scalar(select(User).where(User.email == email))
-
-def get_user(db: Session, user_id: int) -> Optional[User]:
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
     """Get user by ID"""
-    return db.get(User, user_id)
+    return await db.get(User, user_id)
 
 # ===== APPLICATION CRUD OPERATIONS =====
-def create_application(
-    db: Session,
+def application_dedupe_key(company: str, role_title: str) -> str:
+    """Hash of the normalized (company, role_title): case and whitespace are ignored"""
+    normalized = "\x1f".join(" ".join(value.split()).casefold() for value in (company, role_title))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+async def create_application(
+    db: AsyncSession,
     *,
     user_id: int,
     company: str,
@@ -31,10 +55,21 @@ def create_application(
     source: Optional[str],
     status: ApplicationStatus,
     job_url: Optional[str],
-    notes: Optional[str]
-) -> Application:
-    """Create a new application in the database"""
-    app = Application(
+    notes: Optional[str],
+    idempotency_key: Optional[str] = None,
+    dedupe: bool = False
+) -> Tuple[Application, bool]:
+    """
+    Create a new application; returns (application, created).
+    The first row with a given normalized (company, role_title) claims its ``dedupe_key``
+    (unique per user); later copies store NULL. A repeated ``idempotency_key`` returns the
+    row it created, and with ``dedupe`` the claim holder is returned instead of a copy.
+    Both are decided by the unique indexes through INSERT ... ON CONFLICT DO NOTHING, so
+    concurrent requests cannot both insert.
+    """
+    status = _as_status(status)
+    dedupe_key = application_dedupe_key(company, role_title)
+    values = dict(
         user_id=user_id,
         company=company,
         role_title=role_title,
@@ -42,90 +77,424 @@ def create_application(
         status=status,
         job_url=job_url,
         notes=notes,
+        dedupe_key=dedupe_key,
+        idempotency_key=idempotency_key,
     )
-    db.add(app)
-    db.commit()
-    db.refresh(app)
+    insert_ = _dialect_insert(db)
+    
+    async def by_idempotency_key() -> Optional[Application]:
+        if idempotency_key is None:
+            return None
+        return await db.scalar(select(Application).where(
+            Application.user_id == user_id, Application.idempotency_key == idempotency_key
+        ))
+    
+    app = await db.scalar(insert_(Application).values(**values).on_conflict_do_nothing().returning(Application))
+    if app is None:
+        existing = await by_idempotency_key()
+        if existing is None and dedupe:
+            existing = await db.scalar(select(Application).where(
+                Application.user_id == user_id, Application.dedupe_key == dedupe_key
+            ))
+        if existing is None:
+            # Only the claim was taken: store an unclaimed copy. A concurrent request with
+            # the same idempotency key may still win this one, so re-select it if so
+            values["dedupe_key"] = None
+            app = await db.scalar(insert_(Application).values(**values).on_conflict_do_nothing().returning(Application))
+            if app is None:
+                existing = await by_idempotency_key()
+        if existing is not None:
+            await db.commit()
+            return existing, False
+    await adjust_status_counts(db, {(user_id, status): 1})
+    await db.commit()
+    await applications_changed([user_id])
+    record_suggestions([values])
+    return app, True
+
+async def bulk_create_applications(
+    db: AsyncSession,
+    items: List[Dict[str, Any]],
+    *,
+    dedupe: bool = False,
+    _retry: bool = True
+) -> List[Tuple[Optional[int], bool]]:
+    """
+    Insert many applications in one transaction.
+    ``items`` hold Application column values; returns (id, created) per item, with id None
+    where the user does not exist. With ``dedupe``, items matching an existing application
+    or an earlier item of the batch return that id with created False.
+    Users and the batch's already claimed dedupe keys are preloaded with one query each,
+    duplicates are resolved in memory, and rows go in through a multi-row INSERT ... RETURNING.
+    """
+    user_ids = {item["user_id"] for item in items}
+    existing = set((await db.scalars(select(User.id).where(User.id.in_(user_ids)))).all()) if user_ids else set()
+    keys = {
+        (item["user_id"], application_dedupe_key(item["company"], item["role_title"]))
+        for item in items if item["user_id"] in existing
+    }
+    claims: Dict[Tuple[int, str], Tuple[str, int]] = {}
+    if keys:
+        claimed = await db.execute(
+            select(Application.user_id, Application.dedupe_key, Application.id).where(
+                Application.user_id.in_({uid for uid, _ in keys}),
+                Application.dedupe_key.in_({key for _, key in keys}),
+            )
+        )
+        claims = {(uid, key): ("id", app_id) for uid, key, app_id in claimed}
+    
+    rows = []
+    # Per item: None (no user), ("id", id) for an existing application,
+    # ("dup", n) for a copy of rows[n], ("new", n) when inserted as rows[n]
+    outcomes: List[Optional[Tuple[str, int]]] = []
+    deltas: Dict[Tuple[int, ApplicationStatus], int] = Counter()
+    for item in items:
+        if item["user_id"] not in existing:
+            outcomes.append(None)
+            continue
+        claim = (item["user_id"], application_dedupe_key(item["company"], item["role_title"]))
+        holder = claims.get(claim)
+        if holder is not None and dedupe:
+            outcomes.append(holder)
+            continue
+        if holder is None:
+            claims[claim] = ("dup", len(rows))
+        outcomes.append(("new", len(rows)))
+        rows.append({**item, "status": _as_status(item.get("status")), "dedupe_key": None if holder is not None else claim[1]})
+        deltas[(item["user_id"], rows[-1]["status"])] += 1
+    
+    ids: List[int] = []
+    if rows:
+        try:
+            result = await db.execute(
+                insert(Application).returning(Application.id, sort_by_parameter_order=True),
+                rows,
+            )
+        except IntegrityError:
+            # A concurrent insert claimed one of our keys after the preload; start over once
+            await db.rollback()
+            if not _retry:
+                raise
+            return await bulk_create_applications(db, items, dedupe=dedupe, _retry=False)
+        ids = result.scalars().all()
+        await adjust_status_counts(db, deltas)
+        await db.commit()
+        await applications_changed({row["user_id"] for row in rows})
+        record_suggestions(rows)
+    
+    results: List[Tuple[Optional[int], bool]] = []
+    for outcome in outcomes:
+        if outcome is None:
+            results.append((None, False))
+        elif outcome[0] == "id":
+            results.append((outcome[1], False))
+        else:
+            results.append((ids[outcome[1]], outcome[0] == "new"))
+    return results
+
+EXPORT_COLUMNS = (
+    "id", "user_id", "company", "role_title", "source", "status",
+    "job_url", "notes", "applied_at", "created_at", "updated_at",
+)
+
+# Fields of ApplicationOut; list pages select these columns instead of hydrating entities
+LIST_COLUMNS = EXPORT_COLUMNS
+
+async def stream_applications(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    batch_size: int = 1000
+) -> AsyncIterator[List[Row]]:
+    """
+    Yield a user's applications in batches of column rows, oldest first.
+    Uses a server-side cursor so memory stays flat whatever the row count.
+    """
+    stmt = (
+        select(*(getattr(Application, name) for name in EXPORT_COLUMNS))
+        .where(Application.user_id == user_id)
+        .order_by(Application.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield partition
+
+async def update_application_status(
+    db: AsyncSession,
+    *,
+    application_id: int,
+    status: ApplicationStatus
+) -> Optional[Application]:
+    """Change an application's status, keeping the per-user status counts in step"""
+    status = _as_status(status)
+    app = await db.scalar(
+        select(Application).where(Application.id == application_id).with_for_update()
+    )
+    if not app:
+        return None
+    if app.status != status:
+        await adjust_status_counts(db, {(app.user_id, app.status): -1, (app.user_id, status): 1})
+        app.status = status
+        await db.commit()
+        await applications_changed([app.user_id])
     return app
 
-def list_applications(
-    db: Session,
+async def list_applications(
+    db: AsyncSession,
     *,
     user_id: Optional[int],
     status: Optional[ApplicationStatus],
     limit: int,
-    offset: int
-) -> Tuple[List[Application], int]:
-    """List applications with filtering and pagination"""
+    offset: int,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    total_mode: str = "exact",
+    columns: Sequence[str] = LIST_COLUMNS,
+    q: Optional[str] = None,
+    version: Optional[str] = None
+) -> Tuple[List[Row], Optional[int], Optional[str]]:
+    """
+    List applications with filtering and pagination.
+    Pages by ``offset`` or, when ``cursor`` is given, by keyset on (created_at, id).
+    ``q`` restricts to full-text matches ordered best-first (offset paging only).
+    ``total_mode`` is "exact", "estimate" or "none". Exact totals are cached per
+    user/status under the listing ``version`` the caller read (its ETag), and not cached without one.
+    Returns (rows, total, next_cursor). Rows are plain column rows starting with ``columns``
+    in order, followed by created_at/id when those were not requested (for the cursor).
+    """
     # Start with base query
-    stmt = select(Application)
+    names = list(columns) + [name for name in ("created_at", "id") if name not in columns]
+    stmt = select(*(getattr(Application, name) for name in names))
     
     # Apply filters if provided
     if user_id is not None:
         stmt = stmt.where(Application.user_id == user_id)
     if status is not None:
         stmt = stmt.where(Application.status == status)
+    if q:
+        stmt, rank = apply_search(stmt, db.bind.dialect.name, q)
+        total = await _count_applications(db, stmt, user_id=user_id, status=status, mode=total_mode, cache=False)
+        stmt = stmt.order_by(rank, desc(Application.created_at), desc(Application.id)).limit(limit).offset(offset)
+        return (await db.execute(stmt)).all(), total, None
     
     # Get total count (before pagination)
-    total = db.scalar(select(func.count()).select_from(stmt.subquery()))
+    total = await _count_applications(db, stmt, user_id=user_id, status=status, mode=total_mode, version=version)
     
-    # Apply ordering and pagination
-    stmt = stmt.order_by(desc(Application.created_at)).limit(limit).offset(offset)
+    # Apply ordering and pagination; id breaks ties so keyset pages are stable
+    stmt = stmt.order_by(desc(Application.created_at), desc(Application.id)).limit(limit)
+    if cursor is not None:
+        stmt = stmt.where(tuple_(Application.created_at, Application.id) < tuple_(*cursor))
+    else:
+        stmt = stmt.offset(offset)
     
     # Execute query and return results
-    rows = db.scalars(stmt).all()
-    return rows, int(total or 0)
+    rows = (await db.execute(stmt)).all()
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if len(rows) == limit else None
+    return rows, total, next_cursor
+
+class ExplainJSON(Executable, ClauseElement):
+    """
+    ``EXPLAIN (FORMAT JSON) <stmt>`` (Postgres) with the statement's parameters left bound,
+    so user input such as search text is never spliced into SQL.
+    """
+    inherit_cache = False
+
+    def __init__(self, stmt: Select):
+        self.stmt = stmt
+
+@compiles(ExplainJSON, "postgresql")
+def _compile_explain_json(element: ExplainJSON, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+def _count_statement(stmt: Select) -> Select:
+    """COUNT(*) over a listing query; counting a subquery keeps its FROM even when nothing filters it"""
+    return select(func.count()).select_from(stmt.order_by(None).limit(None).offset(None).subquery())
+
+async def _count_applications(
+    db: AsyncSession,
+    stmt: Select,
+    *,
+    user_id: Optional[int],
+    status: Optional[ApplicationStatus],
+    mode: str,
+    cache: bool = True,
+    version: Optional[str] = None
+) -> Optional[int]:
+    """
+    Total for a filtered application query, according to ``mode``.
+    Exact totals are cached under the listing version read before the query. A count that
+    raced with a write is thus stored under the version that write superseded and can never
+    be served with a newer ETag; no per-write invalidation is needed, in any worker.
+    """
+    if mode == "none":
+        return None
+    if mode == "estimate" and db.bind.dialect.name == "postgresql":
+        # Planner row estimate: no table scan, accuracy follows ANALYZE statistics
+        plan = await db.scalar(ExplainJSON(stmt))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    # Exact count (also the estimate fallback on SQLite), cached until the listing version moves on
+    if not cache or version is None:
+        return int(await db.scalar(_count_statement(stmt)) or 0)
+    key = (user_id, status.value if status is not None else None, version)
+    total = count_cache.get(key)
+    if total is None:
+        total = int(await db.scalar(_count_statement(stmt)) or 0)
+        count_cache.set(key, total)
+    return total
+
+async def applications_changed(user_ids: Iterable[int]) -> None:
+    """After a committed write: bump listing versions, retiring their ETags and cached totals"""
+    await listing_versions.bump(user_ids)
+
+# ===== SUGGESTION OPERATIONS =====
+SUGGEST_FIELDS = ("company", "role_title")
+
+def record_suggestions(rows: Iterable[Dict[str, Any]]) -> None:
+    """Add newly created values to any cached suggestion indexes of their users"""
+    values: Dict[Tuple[int, str], List[str]] = defaultdict(list)
+    for row in rows:
+        for field in SUGGEST_FIELDS:
+            values[(row["user_id"], field)].append(row[field])
+    for key, new_values in values.items():
+        index = suggest_cache.peek(key)
+        if isinstance(index, SuggestionIndex):
+            index.add(new_values)
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def suggest_values(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    field: str,
+    prefix: str,
+    limit: int
+) -> List[str]:
+    """
+    Distinct ``field`` values of a user with a word starting with ``prefix``, most used first.
+    Served from a per-user in-memory index; users with more than SUGGEST_CACHE_MAX_VALUES
+    distinct values are queried directly (trigram indexes on Postgres).
+    """
+    column = getattr(Application, field)
+    key = (user_id, field)
+    index = suggest_cache.get(key)
+    if index is None:
+        rows = (await db.execute(
+            select(column, func.count())
+            .where(Application.user_id == user_id)
+            .group_by(column)
+            .limit(settings.SUGGEST_CACHE_MAX_VALUES + 1)
+        )).all()
+        if len(rows) > settings.SUGGEST_CACHE_MAX_VALUES:
+            index = TOO_MANY_VALUES
+        else:
+            index = SuggestionIndex({value: total for value, total in rows})
+        suggest_cache.set(key, index)
+    if index is not TOO_MANY_VALUES:
+        return index.lookup(prefix, limit)
+    
+    pattern = _escape_like(prefix.lower())
+    lowered = func.lower(column)
+    stmt = (
+        select(column)
+        .where(
+            Application.user_id == user_id,
+            or_(lowered.like(f"{pattern}%", escape="\\"), lowered.like(f"% {pattern}%", escape="\\")),
+        )
+        .group_by(column)
+        .order_by(desc(func.count()), column)
+        .limit(limit)
+    )
+    return list((await db.scalars(stmt)).all())
+
+# ===== STATUS COUNT OPERATIONS =====
+def _as_status(status: Optional[ApplicationStatus]) -> ApplicationStatus:
+    """Normalize API/DB status enums (and a missing status) to the model enum"""
+    return ApplicationStatus(status.value) if status is not None else ApplicationStatus.APPLIED
+
+def _dialect_insert(db: AsyncSession):
+    """INSERT construct with ON CONFLICT support for the session's backend"""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+async def adjust_status_counts(db: AsyncSession, deltas: Dict[Tuple[int, ApplicationStatus], int]) -> None:
+    """
+    Apply count deltas to application_status_counts in the caller's transaction.
+    One upsert statement regardless of how many (user, status) pairs change.
+    """
+    rows = [
+        {"user_id": user_id, "status": status, "total": delta}
+        for (user_id, status), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+    insert = _dialect_insert(db)
+    stmt = insert(ApplicationStatusCount).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ApplicationStatusCount.user_id, ApplicationStatusCount.status],
+        set_={"total": ApplicationStatusCount.total + stmt.excluded.total},
+    )
+    await db.execute(stmt)
+
+async def get_status_counts(db: AsyncSession, *, user_id: int) -> Dict[ApplicationStatus, int]:
+    """Per-status application counts for a user, zero-filled (one PK range read)"""
+    counts = {status: 0 for status in ApplicationStatus}
+    result = await db.execute(
+        select(ApplicationStatusCount.status, ApplicationStatusCount.total)
+        .where(ApplicationStatusCount.user_id == user_id)
+    )
+    for status, total in result:
+        counts[status] = total
+    return counts
 
 # ===== API KEY CRUD OPERATIONS =====
-def create_api_key(
-    db: Session, 
+async def create_api_key(
+    db: AsyncSession, 
     *, 
     user_id: int, 
     name: str, 
     prefix: str, 
-    secret_enc: str
+    secret_enc: str,
+    secret_hash: str
 ) -> ApiKey:
-    """Create a new API key for a user"""
-    ak = ApiKey(
-        user_id=user_id,
-        name=name,
-        prefix=prefix,
-        secret_enc=secret_enc
+    """Create a new API key for a user (single INSERT ... RETURNING)"""
+    ak = await db.scalar(
+        insert(ApiKey)
+        .values(
+            user_id=user_id,
+            name=name,
+            prefix=prefix,
+            secret_enc=secret_enc,
+            secret_hash=secret_hash
+        )
+        .returning(ApiKey)
     )
-    db.add(ak)
-    db.commit()
-    db.refresh(ak)
+    await db.commit()
     return ak
 
-def deactivate_api_key(db: Session, *, key_id: int) -> None:
+async def deactivate_api_key(db: AsyncSession, *, key_id: int) -> None:
     """Deactivate an API key (soft delete)"""
-    ak = db.get(ApiKey, key_id)
+    ak = await db.get(ApiKey, key_id)
     if ak:
         ak.is_active = False
-        db.commit()
+        await db.commit()
+        # Revocation must take effect now, in every worker, not when cached entries expire
+        await revocations.publish(ak.prefix)
 
-def list_api_keys(db: Session, *, user_id: int) -> List[ApiKey]:
+async def list_api_keys(db: AsyncSession, *, user_id: int) -> List[ApiKey]:
     """List all API keys for a user"""
-    return db.scalars(
+    return (await db.scalars(
         select(ApiKey)
         .where(ApiKey.user_id == user_id)
         .order_by(ApiKey.created_at.desc())
-    ).all()
-
-def get_api_key_by_prefix(db: Session, *, prefix: str) -> Optional[ApiKey]:
-    """Get API key by its prefix"""
-    return db.scalar(
-        select(ApiKey).where(
-            ApiKey.prefix == prefix,
-            ApiKey.is_active == True
-        )
-    )
+    )).all()
 
-def update_last_used(db: Session, *, key_id: int) -> None:
-    """Update the last_used timestamp for an API key"""
-    db.execute(
-        update(ApiKey)
-        .where(ApiKey.id == key_id)
-        .values(last_used_at=func.now())
-    )
-    db.commit()
\ No newline at end of file
+async def update_last_used(*, key_id: int) -> None:
+    """Record a use of an API key; written to the DB in batches by the write-behind tracker"""
+    if last_used_tracker.record(key_id):
+        await last_used_tracker.flush()
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.config import settings
+from app.db_pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
 from app.models import Base
+from app import models_apikeys  # noqa: F401  (registers api_keys on Base.metadata)
 import os
 
 # Select database URL. During tests (pytest) or explicit test env, use SQLite.
@@ -12,25 +15,59 @@ _is_test_env = (
     or app_env.lower() in ("test", "local", "dev", "development")
 )
 
+pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING == "always",
+)
+
+def _register_unicode_lower(dbapi_connection, connection_record) -> None:
+    dbapi_connection.create_function(
+        "lower", 1, lambda value: value.lower() if isinstance(value, str) else value, deterministic=True
+    )
+
 if _is_test_env:
-    database_url = "sqlite:///./test.db"
-    engine = create_engine(database_url, pool_pre_ping=True, connect_args={"check_same_thread": False})
+    database_url = f"sqlite:///{settings.SQLITE_PATH}"
+    async_database_url = f"sqlite+aiosqlite:///{settings.SQLITE_PATH}"
+    engine = create_engine(
+        database_url, poolclass=InstrumentedQueuePool, connect_args={"check_same_thread": False}, **pool_options
+    )
+    async_engine = create_async_engine(
+        async_database_url, poolclass=InstrumentedAsyncAdaptedQueuePool, connect_args={"check_same_thread": False}, **pool_options
+    )
+    # SQLite's built-in lower() only folds ASCII; match Python (and Postgres) case folding
+    for _engine in (engine, async_engine.sync_engine):
+        event.listen(_engine, "connect", _register_unicode_lower)
 else:
-    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+    engine = create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options)
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncAdaptedQueuePool, **pool_options
+    )
 
 # Ensure tables exist (helps in local dev and tests)
 Base.metadata.create_all(bind=engine)
+if engine.dialect.name == "sqlite":
+    # Postgres gets its search column/index from alembic; SQLite uses an FTS5 table
+    from app.search import install_sqlite_fts
+    with engine.begin() as conn:
+        install_sqlite_fts(conn)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
+# Async sessions are used on the request path so DB round-trips never block the event loop
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 def db_ok() -> bool:
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
     return True
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def pool_status() -> dict:
+    """Pool occupancy and checkout statistics for both engines of this worker"""
+    return {"async": async_engine.pool.status_dict(), "sync": engine.pool.status_dict()}
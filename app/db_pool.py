@@ -0,0 +1,63 @@
+import bisect
+import time
+from typing import Any, Dict, List
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+class PoolStats:
+    """Checkout wait histogram and timeout counter for one connection pool"""
+
+    # Upper bounds (ms) of the wait-time histogram buckets; a final bucket catches the rest
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_sum_ms = 0.0
+        self.wait_buckets: List[int] = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def observe(self, wait_ms: float) -> None:
+        self.checkouts += 1
+        self.wait_sum_ms += wait_ms
+        self.wait_buckets[bisect.bisect_left(self.BUCKETS_MS, wait_ms)] += 1
+
+    def snapshot(self, pool: QueuePool) -> Dict[str, Any]:
+        labels = [f"le_{b}ms" for b in self.BUCKETS_MS] + ["inf"]
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_s": pool.timeout(),
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.timeouts,
+            "wait_ms_sum": round(self.wait_sum_ms, 3),
+            "wait_ms_histogram": dict(zip(labels, self.wait_buckets)),
+        }
+
+class _InstrumentedPoolMixin:
+    """Times ``_do_get`` (queue wait plus any new connect) and counts checkout timeouts"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.observe((time.perf_counter() - start) * 1000)
+        return conn
+
+    def status_dict(self) -> Dict[str, Any]:
+        return self.stats.snapshot(self)
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
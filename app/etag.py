@@ -0,0 +1,91 @@
+"""
+Version counters behind the ETags of application listings.
+
+Every write to a user's applications bumps that user's counter and a global one
+(used by listings without ``user_id``). A listing's ETag is derived from the
+counter and its query parameters, so a matching If-None-Match can be answered
+with 304 before any SQL runs.
+
+With Redis connected the counters live there and are shared by all workers.
+The in-process counters are tagged with a per-process epoch so tags issued by
+another worker or a previous process never match; without Redis, run a single
+worker if writes and polls may land on different processes.
+"""
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from redis.exceptions import RedisError
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_ALL = "all"
+
+class ListingVersions:
+    """Per-user (and global) listing version counters, in Redis when available"""
+
+    def __init__(self):
+        self.epoch = secrets.token_hex(4)
+        self._local: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scope(user_id: Optional[int]) -> str:
+        return _ALL if user_id is None else str(user_id)
+
+    async def bump(self, user_ids: Iterable[int]) -> None:
+        """Invalidate listings of ``user_ids`` (and every unfiltered listing)"""
+        scopes = [self._scope(u) for u in set(user_ids)] + [_ALL]
+        with self._lock:
+            for scope in scopes:
+                self._local[scope] = self._local.get(scope, 0) + 1
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for scope in scopes:
+                # Seed missing counters from the clock so a flushed Redis never reissues old tags
+                pipe.set(f"listver:{scope}", time.time_ns(), nx=True)
+                pipe.incr(f"listver:{scope}")
+            await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Redis listing versions unavailable ({e}); ETags may be stale until it recovers")
+
+    async def current(self, user_id: Optional[int]) -> Optional[str]:
+        """Current version token for a listing scope, or None if it cannot be determined"""
+        scope = self._scope(user_id)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                value = await redis.get(f"listver:{scope}")
+                if value is None:
+                    await redis.set(f"listver:{scope}", time.time_ns(), nx=True)
+                    value = await redis.get(f"listver:{scope}")
+                return f"r{value}"
+            except RedisError as e:
+                logger.warning(f"Redis listing versions unavailable ({e}); not issuing ETags")
+                return None
+        with self._lock:
+            return f"{self.epoch}.{self._local.get(scope, 0)}"
+
+listing_versions = ListingVersions()
+
+def make_etag(version: str, params: Dict[str, object]) -> str:
+    """Strong ETag for a listing version and its (normalized) query parameters"""
+    canonical = "&".join(f"{k}={'' if v is None else v}" for k, v in sorted(params.items()))
+    return '"' + hashlib.sha1(f"{version}|{canonical}".encode()).hexdigest()[:24] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak comparison, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
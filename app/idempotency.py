@@ -0,0 +1,260 @@
+"""
+Idempotency-Key response cache for POST requests.
+
+A POST carrying ``Idempotency-Key`` is executed once per (caller, key, path); the
+response status, headers and body are stored for IDEMPOTENCY_TTL_SECONDS and
+replayed for retries without running the endpoint. The caller is the X-API-Key
+presented, which must still authenticate when a response is replayed (a revoked
+key gets 401, not the stored response). Requests without an API key and the
+secret-bearing sign-up routes (/users, /api-keys) bypass the cache entirely.
+Concurrent duplicates wait for the first request to finish instead of executing
+twice. Reusing a key with a different query string or body is rejected with 422.
+
+POST /api-keys is not covered: a retried key creation still creates (and returns)
+another key, so clients should list and revoke any spare key after a retry.
+
+Records live in Redis when it is connected (shared by all workers) and in an
+in-process LRU (``app.cache.idempotency_cache``) otherwise.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from redis.exceptions import RedisError
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.auth import require_api_key
+from app.cache import idempotency_cache
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Outcomes that depend on state which may change between retries are not replayed
+UNCACHEABLE_STATUSES = {401, 403, 408, 409, 425, 429}
+
+# Unauthenticated routes whose responses carry secrets (the API key token); never stored
+UNCACHED_PATHS = ("/users", "/api-keys")
+
+class _LocalBackend:
+    """In-process records plus one future per in-flight key for waiters"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return idempotency_cache.get(key)
+
+    async def put(self, key: str, record: Dict[str, Any]) -> None:
+        idempotency_cache.set(key, record)
+
+    async def lock(self, key: str) -> bool:
+        if key in self._inflight:
+            return False
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+        return True
+
+    async def unlock(self, key: str) -> None:
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def wait(self, key: str, timeout: float) -> None:
+        future = self._inflight.get(key)
+        if future is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+class _RedisBackend:
+    """Records and locks in Redis; waiters poll since the lock holder may be another worker"""
+    POLL_SECONDS = 0.05
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(f"idem:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    async def put(self, key: str, record: Dict[str, Any]) -> None:
+        await self.redis.set(f"idem:{key}", json.dumps(record), ex=settings.IDEMPOTENCY_TTL_SECONDS)
+
+    async def lock(self, key: str) -> bool:
+        return bool(await self.redis.set(f"idem-lock:{key}", 1, nx=True, ex=settings.IDEMPOTENCY_LOCK_SECONDS))
+
+    async def unlock(self, key: str) -> None:
+        await self.redis.delete(f"idem-lock:{key}")
+
+    async def wait(self, key: str, timeout: float) -> None:
+        await asyncio.sleep(min(self.POLL_SECONDS, timeout))
+
+_local = _LocalBackend()
+
+async def _acquire(backend, key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Returns (record, False) to replay a stored response, (None, True) when the caller owns
+    the key and must execute then unlock, or (None, False) if another request kept it too long.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_SECONDS
+    while True:
+        record = await backend.get(key)
+        if record is not None:
+            return record, False
+        if await backend.lock(key):
+            # The previous holder may have stored its record between our get and lock
+            record = await backend.get(key)
+            if record is not None:
+                await backend.unlock(key)
+                return record, False
+            return None, True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None, False
+        await backend.wait(key, remaining)
+
+def _bypassed(path: str) -> bool:
+    return any(path == p or path.startswith(p + "/") for p in UNCACHED_PATHS)
+
+def _request_key(scope: Scope, api_key: str, idempotency_key: str) -> str:
+    raw = "\n".join((api_key, idempotency_key, scope["method"], scope["path"]))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+async def _authenticate(api_key: str) -> Optional[HTTPException]:
+    """Run the regular API key check (cached, so usually no DB access); returns its error, if any"""
+    async with AsyncSessionLocal() as db:
+        try:
+            await require_api_key(x_api_key=api_key, db=db)
+        except HTTPException as e:
+            return e
+    return None
+
+async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, **headers: str) -> None:
+    response = JSONResponse(status_code=status_code, content={"detail": detail}, headers=headers or None)
+    await response(scope, receive, send)
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware implementing the Idempotency-Key contract for POST requests"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        api_key = headers.get("x-api-key")
+        if idempotency_key is None or not api_key or _bypassed(scope["path"]):
+            # Stored responses must belong to one authenticated caller and hold no secrets
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > 255:
+            await _reject(scope, receive, send, 400, "Idempotency-Key must be 1-255 characters")
+            return
+
+        # Buffer the body (already capped by SignatureCaptureMiddleware) to fingerprint it
+        # together with the query string, which changes what e.g. bulk?dedupe=true does
+        messages: List[Message] = []
+        digest = hashlib.sha256(scope.get("query_string", b"") + b"\n")
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            digest.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        fingerprint = digest.hexdigest()
+
+        key = _request_key(scope, api_key, idempotency_key)
+        redis = get_redis()
+        backend = _RedisBackend(redis) if redis is not None else _local
+        try:
+            record, acquired = await _acquire(backend, key)
+        except RedisError as e:
+            logger.warning(f"Redis idempotency store unavailable ({e}); using in-process store")
+            backend = _local
+            record, acquired = await _acquire(backend, key)
+
+        if record is not None:
+            # The key may have been revoked (or its user removed) since the response was stored
+            error = await _authenticate(api_key)
+            if error is not None:
+                await _reject(scope, receive, send, error.status_code, error.detail)
+                return
+            if record["fingerprint"] != fingerprint:
+                await _reject(scope, receive, send, 422, "Idempotency-Key was already used with a different request")
+                return
+            await self._replay(record, send)
+            return
+        if not acquired:
+            await _reject(
+                scope, receive, send, 409,
+                "A request with this Idempotency-Key is still in progress", **{"Retry-After": "1"},
+            )
+            return
+
+        pending = iter(messages)
+
+        async def replay_receive() -> Message:
+            message = next(pending, None)
+            return message if message is not None else await receive()
+
+        start: Optional[Message] = None
+        body = bytearray()
+        complete = False
+
+        async def capture_send(message: Message) -> None:
+            nonlocal start, complete
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                if len(body) <= settings.IDEMPOTENCY_MAX_BODY_BYTES:
+                    body.extend(message.get("body", b""))
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if (
+                complete
+                and start is not None
+                and start["status"] < 500
+                and start["status"] not in UNCACHEABLE_STATUSES
+                and len(body) <= settings.IDEMPOTENCY_MAX_BODY_BYTES
+            ):
+                await self._store(backend, key, {
+                    "fingerprint": fingerprint,
+                    "status": start["status"],
+                    "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in start.get("headers", [])],
+                    "body": base64.b64encode(bytes(body)).decode(),
+                })
+        finally:
+            try:
+                await backend.unlock(key)
+            except RedisError as e:
+                logger.warning(f"Redis idempotency lock not released ({e}); it expires on its own")
+
+    @staticmethod
+    async def _store(backend, key: str, record: Dict[str, Any]) -> None:
+        try:
+            await backend.put(key, record)
+        except RedisError as e:
+            logger.warning(f"Redis idempotency store unavailable ({e}); response not stored")
+
+    @staticmethod
+    async def _replay(record: Dict[str, Any], send: Send) -> None:
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["headers"]]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": base64.b64decode(record["body"])})
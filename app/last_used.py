@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import DateTime, Integer, bindparam, column, or_, update, values
+from app.config import settings
+from app.db import async_engine
+from app.models_apikeys import ApiKey
+
+logger = logging.getLogger(__name__)
+
+class LastUsedTracker:
+    """
+    Write-behind aggregator for ``api_keys.last_used_at``.
+
+    Requests only record the latest use per key id in memory; pending values are
+    written in one bulk UPDATE every ``flush_interval`` seconds or as soon as
+    ``max_pending`` distinct keys are waiting.
+    """
+
+    def __init__(self, *, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, key_id: int, when: Optional[datetime] = None) -> bool:
+        """Remember a use of ``key_id``. Returns True when a flush is due."""
+        self._pending[key_id] = when or datetime.utcnow()
+        return len(self._pending) >= self.max_pending
+
+    async def flush(self) -> int:
+        """Write all pending timestamps in a single statement; returns the number of keys"""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            async with async_engine.begin() as conn:
+                if conn.dialect.name == "postgresql":
+                    # UPDATE api_keys SET ... FROM (VALUES ...) AS v(id, ts) WHERE api_keys.id = v.id
+                    v = values(column("id", Integer), column("ts", DateTime), name="v").data(list(batch.items()))
+                    await conn.execute(
+                        update(ApiKey)
+                        .where(ApiKey.id == v.c.id)
+                        .where(or_(ApiKey.last_used_at.is_(None), ApiKey.last_used_at < v.c.ts))
+                        .values(last_used_at=v.c.ts)
+                    )
+                else:
+                    # SQLite has no aliased VALUES lists; one executemany of the same statement
+                    table = ApiKey.__table__
+                    await conn.execute(
+                        update(table)
+                        .where(table.c.id == bindparam("b_id"))
+                        .where(or_(table.c.last_used_at.is_(None), table.c.last_used_at < bindparam("b_ts")))
+                        .values(last_used_at=bindparam("b_ts")),
+                        [{"b_id": key_id, "b_ts": ts} for key_id, ts in batch.items()],
+                    )
+        except Exception:
+            # Put the batch back without clobbering newer uses recorded meanwhile
+            for key_id, ts in batch.items():
+                if key_id not in self._pending or self._pending[key_id] < ts:
+                    self._pending[key_id] = ts
+            logger.exception("Failed to flush last_used_at for %d API keys", len(batch))
+            return 0
+        return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the periodic flush task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic task and write out whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+last_used_tracker = LastUsedTracker(
+    flush_interval=settings.LAST_USED_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.LAST_USED_FLUSH_MAX_KEYS,
+)
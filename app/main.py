@@ -1,13 +1,19 @@
-from fastapi import FastAPI, Depends
-from app.db import db_ok
+from fastapi import FastAPI, Depends, Response
+from app.db import db_ok, engine, async_engine
+from app.last_used import last_used_tracker
 from app.routes.users import router as users_router
 from app.routes.applications import router as applications_router
 from app.routes.api_keys import router as apikeys_router
+from app.routes.internal import router as internal_router
 from app.config import settings
-from fastapi_limiter import FastAPILimiter
-import redis.asyncio as aioredis
 from app.auth import SignatureCaptureMiddleware, require_api_key, verify_signature_if_present
-from fastapi_limiter.depends import RateLimiter
+from app.idempotency import IdempotencyMiddleware
+from app.ratelimit import enforce_rate_limit
+from app.redis_client import init_redis, close_redis
+from app.revocations import revocations
+from app.metrics import MetricsMiddleware, mark_process_dead, render_metrics
+from app.timing import ServerTimingMiddleware, instrument_engine
+from app import query_log
 from contextlib import asynccontextmanager
 import logging
 import os
@@ -22,41 +28,46 @@ app = FastAPI(
     description="Job Application Tracking API with Authentication and Rate Limiting"
 )
 
-# Add middleware for signature capture (placeholder for future use)
+# Idempotency-Key replay for POSTs; innermost, so bodies are already size-capped
+app.add_middleware(IdempotencyMiddleware)
+# Body size limit and streaming signature hashing (pure ASGI)
 app.add_middleware(SignatureCaptureMiddleware)
-
-# Initialize FastAPILimiter with None for test environment
-# This will be properly initialized in the lifespan event handler
+# Sampled Server-Timing breakdown; not installed at all when the sample rate is 0
+if settings.SERVER_TIMING_SAMPLE_RATE > 0:
+    app.add_middleware(ServerTimingMiddleware, sample_rate=settings.SERVER_TIMING_SAMPLE_RATE)
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+# Slow-query log and per-request statement counts
+if settings.QUERY_LOG_ENABLED:
+    app.add_middleware(query_log.QueryCountMiddleware)
+    query_log.instrument_engine(engine)
+    query_log.instrument_engine(async_engine.sync_engine)
+# Outermost, so latency covers every other middleware and early 413s
+app.add_middleware(MetricsMiddleware)
+
+# Redis is optional: without it, rate limits fall back to per-process buckets
 @app.on_event("startup")
 async def startup_event():
-    """Initialize rate limiter on startup"""
-    try:
-        # Check if we're in test environment
-        if os.getenv("APP_ENV") == "test":
-            # Initialize with None to disable rate limiting in tests
-            await FastAPILimiter.init(None)
-            logger.info("Rate limiter disabled for test environment")
-        else:
-            # Try to connect to Redis
-            redis_client = aioredis.from_url(
-                settings.REDIS_URL, 
-                encoding="utf-8", 
-                decode_responses=True
-            )
-            # Test the connection
-            await redis_client.ping()
-            await FastAPILimiter.init(redis_client)
-            logger.info("Redis connection established and rate limiter initialized")
-    except Exception as e:
-        logger.warning(f"Failed to connect to Redis: {e}. Rate limiting will be disabled.")
-        # Initialize with None to disable rate limiting
-        await FastAPILimiter.init(None)
+    """Connect to Redis and start background writers on startup"""
+    last_used_tracker.start()
+    # Check if we're in test environment
+    if os.getenv("APP_ENV") == "test":
+        logger.info("Redis skipped for test environment; using in-process rate limits")
+    elif await init_redis():
+        logger.info("Redis connection established; rate limits are shared across workers")
+        revocations.start()
+    else:
+        logger.warning("Redis unavailable; rate limits and API key revocation are per process")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown"""
-    await FastAPILimiter.close()
-    logger.info("Rate limiter closed")
+    await last_used_tracker.stop()
+    await revocations.stop()
+    await close_redis()
+    logger.info("Redis connection closed")
+    await async_engine.dispose()
+    mark_process_dead()
 
 @app.get("/healthz")
 def healthz():
@@ -70,25 +81,25 @@ def healthz():
             "db": f"error: {e.__class__.__name__}"
         }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics (aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Include all routers
 app.include_router(users_router, tags=["users"])
 app.include_router(apikeys_router, tags=["api-keys"])
+app.include_router(internal_router, tags=["internal"])
 
 # Create secured router for applications endpoints
-from fastapi import APIRouter, Request, Response
-
-async def conditional_rate_limit(request: Request, response: Response):
-    """Apply rate limiting only if FastAPILimiter is initialized (i.e., Redis available)."""
-    if FastAPILimiter.redis:
-        limiter = RateLimiter(times=60, seconds=60)
-        return await limiter(request, response)
-    return None
+from fastapi import APIRouter
 
 secured = APIRouter(
     dependencies=[
         Depends(require_api_key),
         Depends(verify_signature_if_present),
-        Depends(conditional_rate_limit),
+        Depends(enforce_rate_limit),
     ]
 )
 
@@ -139,5 +150,6 @@ async def not_found_handler(request: Request, exc):
 async def rate_limit_handler(request: Request, exc):
     return JSONResponse(
         status_code=429,
-        content={"detail": "Rate limit exceeded. Please try again later."}
+        content={"detail": "Rate limit exceeded. Please try again later."},
+        headers=getattr(exc, "headers", None),
     )
\ No newline at end of file
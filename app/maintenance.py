@@ -0,0 +1,37 @@
+"""
+Maintenance commands that operate directly on the database.
+
+    python -m app.maintenance rebuild-status-counts
+"""
+import argparse
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.db import engine
+from app.models import Application, ApplicationStatusCount
+
+def rebuild_status_counts(s: Session) -> int:
+    """Recompute application_status_counts from applications; returns the number of rows written"""
+    s.execute(delete(ApplicationStatusCount))
+    grouped = (
+        select(Application.user_id, Application.status, func.count())
+        .group_by(Application.user_id, Application.status)
+    )
+    result = s.execute(
+        insert(ApplicationStatusCount).from_select(
+            [ApplicationStatusCount.user_id, ApplicationStatusCount.status, ApplicationStatusCount.total],
+            grouped,
+        )
+    )
+    s.commit()
+    return result.rowcount
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LIJOA database maintenance")
+    parser.add_argument("command", choices=["rebuild-status-counts"])
+    args = parser.parse_args()
+    with Session(engine) as s:
+        if args.command == "rebuild-status-counts":
+            print("Rebuilt status counts:", rebuild_status_counts(s), "rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Prometheus instrumentation.
+
+Set PROMETHEUS_MULTIPROC_DIR (an empty, writable directory shared by the uvicorn
+workers) to aggregate metrics across processes; /metrics then merges every
+worker's samples instead of reporting only the one that served the scrape.
+"""
+import os
+import time
+from typing import Dict, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", multiprocess_mode="livesum"
+)
+AUTH_FAILURES = Counter(
+    "auth_failures_total", "Rejected API key / signature checks by reason", ["reason"]
+)
+RATE_LIMITED = Counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter"
+)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording count, latency and in-flight requests per route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # Resolved label children per (method, route, status), so the hot path skips labels()
+        self._children: Dict[Tuple[str, str, int], Tuple[object, object]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        
+        async def status_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, status_send)
+        finally:
+            self.record(scope, status_code, time.perf_counter() - start)
+            IN_FLIGHT.dec()
+
+    def record(self, scope: Scope, status_code: int, elapsed: float) -> None:
+        # Route templates (not raw paths) keep label cardinality bounded
+        route = scope.get("route")
+        template = getattr(route, "path", None) or "unmatched"
+        key = (scope["method"], template, status_code)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                LATENCY.labels(key[0], template),
+                REQUESTS.labels(key[0], template, str(status_code)),
+            )
+        children[0].observe(elapsed)
+        children[1].inc()
+
+class PoolCollector:
+    """Exports connection pool statistics of the scraped worker at collection time"""
+
+    def collect(self):
+        from app.db import pool_status
+        
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections checked out", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Overflow connections in use", labels=["engine"])
+        timeouts = CounterMetricFamily("db_pool_checkout_timeouts", "Checkout timeouts", labels=["engine"])
+        for name, stats in pool_status().items():
+            checked_out.add_metric([name], stats["checked_out"])
+            overflow.add_metric([name], stats["overflow"])
+            timeouts.add_metric([name], stats["checkout_timeouts"])
+        yield from (checked_out, overflow, timeouts)
+
+if not MULTIPROCESS:
+    REGISTRY.register(PoolCollector())
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Serialized metrics and content type for the /metrics endpoint"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(PoolCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the multi-process files on shutdown"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
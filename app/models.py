@@ -39,7 +39,23 @@ class Application(Base):
     applied_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # sha256 of the normalized (company, role_title), set only on the first such row of a user
+    dedupe_key: Mapped[Optional[str]] = mapped_column(String(64))
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(255))
     
     user: Mapped["User"] = relationship(back_populates="applications")
 
-Index("ix_applications_user_company_role", Application.user_id, Application.company, Application.role_title, unique=False)
\ No newline at end of file
+class ApplicationStatusCount(Base):
+    """Per-user application count for each status, maintained by the write paths in app.crud"""
+    __tablename__ = "application_status_counts"
+    
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    status: Mapped[ApplicationStatus] = mapped_column(Enum(ApplicationStatus), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+
+Index("ix_applications_user_company_role", Application.user_id, Application.company, Application.role_title, unique=False)
+# Arbiters for duplicate detection and idempotent creates (NULLs never conflict)
+Index("ux_applications_user_dedupe_key", Application.user_id, Application.dedupe_key, unique=True)
+Index("ux_applications_user_idempotency_key", Application.user_id, Application.idempotency_key, unique=True)
+# Serves keyset pagination: WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+Index("ix_applications_user_created_id", Application.user_id, Application.created_at.desc(), Application.id.desc())
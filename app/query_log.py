@@ -0,0 +1,188 @@
+"""
+Query instrumentation via SQLAlchemy engine events.
+
+Every statement is attributed to the route that issued it (or "background" for
+work outside a request), aggregated per statement fingerprint, and logged when
+it runs longer than SLOW_QUERY_THRESHOLD_MS. Requests issuing more than
+QUERY_COUNT_WARN_THRESHOLD statements are flagged as likely N+1 patterns.
+Parameter values are never recorded, only their shape.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class RequestQueries:
+    """Statements issued while handling one request"""
+    __slots__ = ("scope", "count")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.count = 0
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route on the scope; resolve lazily
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', None) or 'unmatched'}"
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+def _statement_fingerprint(statement: str) -> str:
+    return hashlib.sha1(" ".join(statement.split()).encode()).hexdigest()[:12]
+
+def _params_fingerprint(parameters: Any, executemany: bool) -> str:
+    """Shape of the bound parameters (names/types and row count), without values"""
+    rows = parameters if executemany else [parameters]
+    first = rows[0] if rows else ()
+    if isinstance(first, dict):
+        shape = ",".join(f"{k}:{type(v).__name__}" for k, v in first.items())
+    else:
+        shape = ",".join(type(v).__name__ for v in (first or ()))
+    return f"{len(rows)}x({shape})" if executemany else f"({shape})"
+
+class QueryStats:
+    """Per-fingerprint statement aggregates plus per-route N+1 flags, bounded in size"""
+
+    def __init__(self, *, max_statements: int = 1000):
+        self.max_statements = max_statements
+        self._statements: Dict[str, Dict[str, Any]] = {}
+        self._flagged: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.slow = 0
+        self.dropped = 0
+
+    def record(self, statement: str, duration_ms: float, route: str, slow: bool) -> None:
+        fingerprint = _statement_fingerprint(statement)
+        with self._lock:
+            if slow:
+                self.slow += 1
+            entry = self._statements.get(fingerprint)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    self.dropped += 1
+                    return
+                entry = self._statements[fingerprint] = {
+                    "fingerprint": fingerprint,
+                    "statement": " ".join(statement.split())[:500],
+                    "calls": 0,
+                    "slow_calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": {},
+                }
+            entry["calls"] += 1
+            entry["slow_calls"] += slow
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["routes"][route] = entry["routes"].get(route, 0) + 1
+
+    def flag_request(self, route: str, statements: int) -> None:
+        with self._lock:
+            entry = self._flagged.setdefault(route, {"requests": 0, "max_statements": 0})
+            entry["requests"] += 1
+            entry["max_statements"] = max(entry["max_statements"], statements)
+
+    def top(self, n: int, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = sorted(self._statements.values(), key=lambda e: e[order_by], reverse=True)[:n]
+            return [
+                {
+                    **entry,
+                    "routes": dict(entry["routes"]),
+                    "total_ms": round(entry["total_ms"], 3),
+                    "max_ms": round(entry["max_ms"], 3),
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+                }
+                for entry in entries
+            ]
+
+    def stats(self, n: int, order_by: str = "total_ms") -> Dict[str, Any]:
+        top = self.top(n, order_by)
+        with self._lock:
+            return {
+                "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+                "statement_count_threshold": settings.QUERY_COUNT_WARN_THRESHOLD,
+                "slow_statements": self.slow,
+                "distinct_statements": len(self._statements),
+                "dropped": self.dropped,
+                "top": top,
+                "n_plus_one_routes": {route: dict(v) for route, v in self._flagged.items()},
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._flagged.clear()
+            self.slow = 0
+            self.dropped = 0
+
+query_stats = QueryStats()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_log_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_log_start")
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    request = _current.get()
+    if request is not None:
+        request.count += 1
+        route = request.route
+    else:
+        route = "background"
+    slow = duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+    query_stats.record(statement, duration_ms, route, slow)
+    if slow:
+        logger.warning(
+            "slow query",
+            extra={
+                "duration_ms": round(duration_ms, 3),
+                "route": route,
+                "fingerprint": _statement_fingerprint(statement),
+                "params": _params_fingerprint(parameters, executemany),
+                "statement": " ".join(statement.split())[:1000],
+            },
+        )
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the query log listeners to a (sync) engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class QueryCountMiddleware:
+    """Pure ASGI middleware that attributes statements to the current route and flags N+1 requests"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request = RequestQueries(scope)
+        token = _current.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            if request.count > settings.QUERY_COUNT_WARN_THRESHOLD:
+                route = request.route
+                query_stats.flag_request(route, request.count)
+                logger.warning(
+                    "possible N+1: %d statements in %s",
+                    request.count,
+                    route,
+                    extra={"route": route, "statements": request.count},
+                )
@@ -0,0 +1,172 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from fastapi import Depends, HTTPException, Response, status
+from redis.exceptions import NoScriptError, RedisError
+from app.auth import ApiKeyPrincipal, require_api_key
+from app.config import settings
+from app.redis_client import get_redis
+from app.metrics import RATE_LIMITED
+from app.timing import timed
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class RateLimit:
+    times: int
+    seconds: int
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_ms: int        # until the bucket is full again
+    retry_after_ms: int  # until the next request would be allowed
+
+# Token bucket in one round-trip. Uses the Redis clock so all workers agree on time.
+# KEYS[1] bucket key; ARGV[1] capacity; ARGV[2] refill rate in tokens per millisecond
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+local reset_ms = math.ceil((capacity - tokens) / rate)
+redis.call('PEXPIRE', KEYS[1], reset_ms + 1000)
+local retry_ms = 0
+if allowed == 0 then
+  retry_ms = math.ceil((1 - tokens) / rate)
+end
+return {allowed, math.floor(tokens), reset_ms, retry_ms}
+"""
+
+class LocalTokenBucket:
+    """In-process token buckets, used when Redis is unavailable. Bounded LRU by key."""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        capacity = float(limit.times)
+        rate = limit.times / (limit.seconds * 1000)  # tokens per ms
+        now = time.monotonic() * 1000
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit.times,
+            remaining=int(tokens),
+            reset_ms=math.ceil((capacity - tokens) / rate),
+            retry_after_ms=0 if allowed else math.ceil((1 - tokens) / rate),
+        )
+
+class RateLimiter:
+    """
+    Token-bucket limiter: one EVALSHA per check against Redis, falling back to
+    ``LocalTokenBucket`` while Redis is unreachable (limits become per-worker).
+    """
+
+    REDIS_RETRY_SECONDS = 5.0
+
+    def __init__(self):
+        self.local = LocalTokenBucket()
+        self._sha: Optional[str] = None
+        self._redis_down_until = 0.0
+
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        redis = get_redis()
+        if redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return await self._hit_redis(redis, key, limit)
+            except RedisError as e:
+                logger.warning(f"Redis rate limiter unavailable ({e}); using in-process limits")
+                self._redis_down_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+        return self.local.hit(key, limit)
+
+    async def _hit_redis(self, redis, key: str, limit: RateLimit) -> RateLimitResult:
+        args = (limit.times, repr(limit.times / (limit.seconds * 1000)))
+        if self._sha is None:
+            self._sha = await redis.script_load(TOKEN_BUCKET_LUA)
+        try:
+            allowed, remaining, reset_ms, retry_ms = await redis.evalsha(self._sha, 1, f"rl:{key}", *args)
+        except NoScriptError:
+            # Script cache flushed (restart/failover): reload once
+            self._sha = await redis.script_load(TOKEN_BUCKET_LUA)
+            allowed, remaining, reset_ms, retry_ms = await redis.evalsha(self._sha, 1, f"rl:{key}", *args)
+        return RateLimitResult(
+            allowed=bool(int(allowed)),
+            limit=limit.times,
+            remaining=int(remaining),
+            reset_ms=int(reset_ms),
+            retry_after_ms=int(retry_ms),
+        )
+
+rate_limiter = RateLimiter()
+
+@lru_cache(maxsize=1024)
+def _parse_limit(spec: str) -> RateLimit:
+    """Parse "times/seconds", e.g. "600/60" """
+    times, seconds = spec.split("/", 1)
+    return RateLimit(times=int(times), seconds=int(seconds))
+
+def limit_for(prefix: str) -> RateLimit:
+    """Per-key override from RATE_LIMIT_OVERRIDES, else the default limit"""
+    spec = settings.RATE_LIMIT_OVERRIDES.get(prefix)
+    if spec:
+        return _parse_limit(spec)
+    return RateLimit(times=settings.RATE_LIMIT_TIMES, seconds=settings.RATE_LIMIT_SECONDS)
+
+def _headers(result: RateLimitResult) -> dict:
+    return {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset_ms / 1000)),
+    }
+
+@timed("ratelimit")
+async def enforce_rate_limit(
+    response: Response,
+    api: ApiKeyPrincipal = Depends(require_api_key),
+) -> None:
+    """Dependency: token-bucket limit per API key prefix, reported via X-RateLimit-* headers"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    result = await rate_limiter.hit(api.prefix, limit_for(api.prefix))
+    headers = _headers(result)
+    if not result.allowed:
+        RATE_LIMITED.inc()
+        headers["Retry-After"] = str(max(1, math.ceil(result.retry_after_ms / 1000)))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=headers,
+        )
+    response.headers.update(headers)
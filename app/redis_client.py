@@ -0,0 +1,37 @@
+import logging
+from typing import Optional
+import redis.asyncio as aioredis
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared async Redis client; None when Redis is not configured or unreachable
+_client: Optional[aioredis.Redis] = None
+
+async def init_redis() -> Optional[aioredis.Redis]:
+    """Connect to REDIS_URL; returns None (and stays None) if Redis is unreachable"""
+    global _client
+    client = aioredis.from_url(
+        settings.REDIS_URL,
+        encoding="utf-8",
+        decode_responses=True,
+        socket_connect_timeout=1,
+        socket_timeout=1,
+    )
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning(f"Failed to connect to Redis: {e}")
+        await client.aclose()
+        return None
+    _client = client
+    return client
+
+def get_redis() -> Optional[aioredis.Redis]:
+    return _client
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
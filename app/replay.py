@@ -0,0 +1,62 @@
+import logging
+import threading
+import time
+from typing import List, Set
+from redis.exceptions import RedisError
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+class NonceRing:
+    """
+    In-memory set of seen signatures, bucketed by expiry time in a fixed ring.
+    A slot is reused once its bucket has expired, so cleanup is O(1) per bucket
+    and memory is bounded by the window rather than growing until a sweep.
+    """
+
+    def __init__(self, *, window_seconds: int, bucket_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        self.slots = window_seconds // bucket_seconds + 2
+        self._buckets: List[Set[str]] = [set() for _ in range(self.slots)]
+        self._bucket_ids: List[int] = [-1] * self.slots
+        self._lock = threading.Lock()
+
+    def add(self, key: str, expires_at: float) -> bool:
+        """Record ``key`` until ``expires_at``; returns False if it was already recorded"""
+        current = int(time.time() // self.bucket_seconds)
+        target = int(expires_at // self.bucket_seconds)
+        slot = target % self.slots
+        with self._lock:
+            for bucket_id, bucket in zip(self._bucket_ids, self._buckets):
+                if bucket_id >= current and key in bucket:
+                    return False
+            if self._bucket_ids[slot] != target:
+                self._buckets[slot].clear()
+                self._bucket_ids[slot] = target
+            self._buckets[slot].add(key)
+        return True
+
+class ReplayGuard:
+    """Remembers (prefix, signature) pairs for as long as the signature would be accepted"""
+
+    def __init__(self, *, window_seconds: int, bucket_seconds: int):
+        self.local = NonceRing(window_seconds=window_seconds, bucket_seconds=bucket_seconds)
+
+    async def first_use(self, prefix: str, signature: str, expires_at: float) -> bool:
+        """True the first time a signature is seen; False for a replay"""
+        key = f"{prefix}:{signature}"
+        redis = get_redis()
+        if redis is not None:
+            ttl = max(1, int(expires_at - time.time()) + 1)
+            try:
+                return bool(await redis.set(f"replay:{key}", 1, nx=True, ex=ttl))
+            except RedisError as e:
+                logger.warning(f"Redis replay store unavailable ({e}); using in-process store")
+        return self.local.add(key, expires_at)
+
+replay_guard = ReplayGuard(
+    # A signature stays valid until ts + tolerance, and ts may itself be up to tolerance ahead
+    window_seconds=2 * settings.SIGNATURE_TOLERANCE_SECONDS,
+    bucket_seconds=settings.REPLAY_BUCKET_SECONDS,
+)
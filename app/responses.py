@@ -0,0 +1,23 @@
+from typing import Any
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson.
+    Meant for content built from trusted DB rows: the endpoint returns it directly,
+    so FastAPI skips response_model validation and the jsonable_encoder pass.
+    Datetimes, enums and UUIDs are handled natively by orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+def with_dependency_headers(response: Response, sub_response: Response) -> Response:
+    """
+    Copy headers set on the injected ``Response`` (ETag, X-RateLimit-*) onto a response
+    returned directly; FastAPI only merges them into responses it builds itself.
+    """
+    response.headers.raw.extend(sub_response.headers.raw)
+    return response
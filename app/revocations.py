@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Optional
+from redis.exceptions import RedisError
+from app.cache import api_key_cache
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "api-key-revocations"
+
+class RevocationBroadcast:
+    """
+    Propagates API key revocations to the ``api_key_cache`` of every worker.
+
+    The revoking worker evicts its own entry and publishes the key prefix on a Redis
+    channel; each worker's listener evicts it too. The cache is cleared whenever the
+    subscription (re)starts, so revocations published while a worker was disconnected
+    are not missed. Without Redis there is no one to tell: revocation is immediate only
+    in a single-worker deployment.
+    """
+
+    RETRY_SECONDS = 5.0
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, prefix: str) -> None:
+        """Evict ``prefix`` locally and in every other worker subscribed to the channel"""
+        api_key_cache.invalidate(prefix)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.publish(CHANNEL, prefix)
+        except RedisError as e:
+            logger.warning(f"Redis unavailable ({e}); revocation of {prefix} reaches other workers after the cache TTL")
+
+    async def _run(self) -> None:
+        while True:
+            redis = get_redis()
+            if redis is None:
+                return
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                # Anything published before we (re)subscribed may have been missed
+                api_key_cache.clear()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        api_key_cache.invalidate(message["data"])
+            except RedisError as e:
+                logger.warning(f"Revocation listener lost Redis ({e}); resubscribing in {self.RETRY_SECONDS}s")
+                await asyncio.sleep(self.RETRY_SECONDS)
+            finally:
+                await pubsub.aclose()
+
+    def start(self) -> None:
+        """Start listening on the running event loop (call after Redis is connected)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+revocations = RevocationBroadcast()
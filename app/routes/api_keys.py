@@ -1,21 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db
 from app.schemas import ApiKeyCreate, ApiKeyOut, ApiKeyWithToken
 from app import crud
-from app.auth import make_api_key_pair, encrypt_secret
+from app.auth import make_api_key_pair, encrypt_secret, hash_secret
 from app.models import User
 
 router = APIRouter(prefix="/api-keys", tags=["api-keys"])
 
 @router.post("", response_model=ApiKeyWithToken, status_code=status.HTTP_201_CREATED)
-def create_api_key(payload: ApiKeyCreate, db: Session = Depends(get_db)):
+async def create_api_key(payload: ApiKeyCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new API key for a user.
     The token is only returned once - save it securely!
+    Idempotency-Key is not honoured here: a retried request creates another key.
     """
     # Verify user exists
-    user = db.get(User, payload.user_id)
+    user = await db.get(User, payload.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -25,13 +26,14 @@ def create_api_key(payload: ApiKeyCreate, db: Session = Depends(get_db)):
     # Generate new key pair
     prefix, secret, token = make_api_key_pair()
     
-    # Store encrypted secret
-    ak = crud.create_api_key(
+    # Store the secret hash for verification (and the encrypted secret for recovery)
+    ak = await crud.create_api_key(
         db,
         user_id=payload.user_id,
         name=payload.name,
         prefix=prefix,
-        secret_enc=encrypt_secret(secret)
+        secret_enc=encrypt_secret(secret),
+        secret_hash=hash_secret(secret)
     )
     
     # Return token ONCE
@@ -47,12 +49,12 @@ def create_api_key(payload: ApiKeyCreate, db: Session = Depends(get_db)):
     }
 
 @router.get("/{user_id}", response_model=list[ApiKeyOut])
-def list_keys(user_id: int, db: Session = Depends(get_db)):
+async def list_keys(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """List all API keys for a user (without secrets)"""
-    return crud.list_api_keys(db, user_id=user_id)
+    return await crud.list_api_keys(db, user_id=user_id)
 
 @router.delete("/{key_id}", status_code=204)
-def revoke_key(key_id: int, db: Session = Depends(get_db)):
+async def revoke_key(key_id: int, db: AsyncSession = Depends(get_async_db)):
     """Revoke (deactivate) an API key"""
-    crud.deactivate_api_key(db, key_id=key_id)
+    await crud.deactivate_api_key(db, key_id=key_id)
     return
\ No newline at end of file
@@ -1,37 +1,279 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import Optional
-from app.db import get_db
-from app.schemas import ApplicationCreate, ApplicationsList, ApplicationOut, ApplicationStatus
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+from enum import Enum
+import csv
+import io
+import json
+from app.db import AsyncSessionLocal, get_async_db
+from app.schemas import (
+    ApplicationCreate, ApplicationsList, ApplicationOut, ApplicationStatus,
+    ApplicationStats, ApplicationStatusUpdate, BulkImportResult, ExportFormat, SuggestField,
+    Suggestions, TotalMode,
+)
+from app.config import settings
 from app import crud
+from app.pagination import decode_cursor
+from app.etag import etag_matches, listing_versions, make_etag
+from app.responses import FastJSONResponse, with_dependency_headers
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
 @router.post("", response_model=ApplicationOut, status_code=201)
-def create_application(payload: ApplicationCreate, db: Session = Depends(get_db)):
+async def create_application(
+    payload: ApplicationCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    dedupe: bool = Query(
+        default=False,
+        description="Return the existing application (200) if the user already has this company/role",
+    ),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", max_length=255)
+):
     # ensure user exists
-    user = crud.get_user(db, payload.user_id)
+    user = await crud.get_user(db, payload.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    app = crud.create_application(
+    company, role_title = payload.company.strip(), payload.role_title.strip()
+    app, created = await crud.create_application(
         db,
         user_id=payload.user_id,
-        company=payload.company.strip(),
-        role_title=payload.role_title.strip(),
+        company=company,
+        role_title=role_title,
         source=(payload.source or None),
         status=payload.status,
         job_url=payload.job_url,
         notes=payload.notes,
+        idempotency_key=idempotency_key,
+        dedupe=dedupe,
     )
+    if not created:
+        if (
+            idempotency_key is not None
+            and app.idempotency_key == idempotency_key
+            and crud.application_dedupe_key(app.company, app.role_title) != crud.application_dedupe_key(company, role_title)
+        ):
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different application")
+        response.status_code = 200
     return app
 
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def _parse_bulk_body(body: bytes, content_type: str) -> List[Any]:
+    """Decode a JSON array or NDJSON (one object per line) request body"""
+    try:
+        if content_type.split(";")[0].strip().lower() in NDJSON_TYPES:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    return items
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_create_applications(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    dedupe: bool = Query(default=False, description="Report items matching an existing company/role as duplicates")
+):
+    """
+    Import many applications at once.
+    Accepts a JSON array or NDJSON of ApplicationCreate objects and reports a result per item.
+    """
+    raw_items = _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    if len(raw_items) > settings.BULK_IMPORT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BULK_IMPORT_MAX_ITEMS} items per request"
+        )
+    
+    results: List[Dict[str, Any]] = [None] * len(raw_items)
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for index, raw in enumerate(raw_items):
+        try:
+            payload = ApplicationCreate.model_validate(raw)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results[index] = {"index": index, "status": "error", "error": errors}
+            continue
+        valid.append((index, {
+            "user_id": payload.user_id,
+            "company": payload.company.strip(),
+            "role_title": payload.role_title.strip(),
+            "source": (payload.source or None),
+            "status": payload.status,
+            "job_url": payload.job_url,
+            "notes": payload.notes,
+        }))
+    
+    outcomes = await crud.bulk_create_applications(db, [item for _, item in valid], dedupe=dedupe)
+    for (index, _), (app_id, created) in zip(valid, outcomes):
+        if app_id is None:
+            results[index] = {"index": index, "status": "error", "error": "User not found"}
+        else:
+            results[index] = {"index": index, "status": "created" if created else "duplicate", "id": app_id}
+    
+    created = sum(1 for r in results if r["status"] == "created")
+    duplicates = sum(1 for r in results if r["status"] == "duplicate")
+    return {
+        "created": created,
+        "duplicates": duplicates,
+        "failed": len(results) - created - duplicates,
+        "results": results,
+    }
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+async def _export_chunks(user_id: int, fmt: ExportFormat) -> AsyncIterator[bytes]:
+    # The request-scoped session is closed before a streaming body is sent, so use our own
+    async with AsyncSessionLocal() as db:
+        if fmt == ExportFormat.csv:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(crud.EXPORT_COLUMNS)
+            yield buf.getvalue().encode()
+        async for rows in crud.stream_applications(db, user_id=user_id):
+            if fmt == ExportFormat.csv:
+                buf.seek(0)
+                buf.truncate()
+                writer.writerows([_export_value(v) for v in row] for row in rows)
+                yield buf.getvalue().encode()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(crud.EXPORT_COLUMNS, map(_export_value, row)))) + "\n"
+                    for row in rows
+                ).encode()
+
+@router.get("/export")
+async def export_applications(
+    response: Response,
+    user_id: int = Query(...),
+    format: ExportFormat = Query(default=ExportFormat.ndjson)
+):
+    """Stream every application of a user as NDJSON or CSV"""
+    if format == ExportFormat.csv:
+        media_type = "text/csv"
+        headers = {"Content-Disposition": f'attachment; filename="applications-{user_id}.csv"'}
+    else:
+        media_type = "application/x-ndjson"
+        headers = {}
+    return with_dependency_headers(
+        StreamingResponse(_export_chunks(user_id, format), media_type=media_type, headers=headers), response
+    )
+
+@router.get("/stats", response_model=ApplicationStats)
+async def application_stats(
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Query(...)
+):
+    counts = await crud.get_status_counts(db, user_id=user_id)
+    return {
+        "user_id": user_id,
+        "counts": {status.value: total for status, total in counts.items()},
+        "total": sum(counts.values()),
+    }
+
+@router.get("/suggest", response_model=Suggestions)
+async def suggest(
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Query(...),
+    field: SuggestField = Query(...),
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    """Autocomplete for company / role_title: values with a word starting with ``prefix``"""
+    values = await crud.suggest_values(db, user_id=user_id, field=field.value, prefix=prefix, limit=limit)
+    return {"field": field, "prefix": prefix, "suggestions": values}
+
+@router.patch("/{application_id}", response_model=ApplicationOut)
+async def update_application_status(
+    application_id: int,
+    payload: ApplicationStatusUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    app = await crud.update_application_status(db, application_id=application_id, status=payload.status)
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+    return app
+
+def _parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Validate a ``fields=`` projection; None means every ApplicationOut field"""
+    if fields is None:
+        return crud.LIST_COLUMNS
+    columns = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in columns if f not in crud.LIST_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(crud.LIST_COLUMNS)}"
+        )
+    if not columns:
+        raise HTTPException(status_code=400, detail="fields must name at least one field")
+    return columns
+
 @router.get("", response_model=ApplicationsList)
-def list_applications(
-    db: Session = Depends(get_db),
+async def list_applications(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     user_id: Optional[int] = Query(default=None),
     status: Optional[ApplicationStatus] = Query(default=None),
     limit: int = Query(default=20, ge=1, le=100),
-    offset: int = Query(default=0, ge=0)
+    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="Opaque next_cursor from a previous page"),
+    include_total: TotalMode = Query(default=TotalMode.exact),
+    fields: Optional[str] = Query(
+        default=None,
+        description="Comma-separated subset of item fields to return, e.g. id,company,role_title,status",
+    ),
+    q: Optional[str] = Query(
+        default=None, min_length=1, max_length=200,
+        description="Full-text search over company, role_title and notes; results are ranked best-first",
+    ),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match")
 ):
-    items, total = crud.list_applications(db, user_id=user_id, status=status, limit=limit, offset=offset)
-    return {"items": items, "total": total, "limit": limit, "offset": offset}
\ No newline at end of file
+    columns = _parse_fields(fields)
+    # Read the version before querying: a concurrent write can only make the tag stale-early
+    version = await listing_versions.current(user_id)
+    if version is not None:
+        etag = make_etag(version, {
+            "user_id": user_id, "status": status.value if status else None, "limit": limit,
+            "offset": offset, "cursor": cursor, "include_total": include_total.value,
+            "fields": ",".join(columns), "q": q,
+        })
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return with_dependency_headers(Response(status_code=304, headers=headers), response)
+        response.headers.update(headers)
+    
+    keyset = None
+    if cursor is not None:
+        if q:
+            raise HTTPException(status_code=400, detail="Search results are paged by offset, not cursor")
+        if offset:
+            raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+        try:
+            keyset = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    items, total, next_cursor = await crud.list_applications(
+        db, user_id=user_id, status=status, limit=limit, offset=offset, cursor=keyset,
+        total_mode=include_total.value, columns=columns, q=q, version=version,
+    )
+    # Rows come straight from the DB, so skip ApplicationOut validation and encode with orjson
+    content = {
+        "items": [dict(zip(columns, row)) for row in items],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+    }
+    return with_dependency_headers(FastJSONResponse(content), response)
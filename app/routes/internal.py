@@ -0,0 +1,32 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from app.auth import require_internal_key
+from app.cache import api_key_cache, count_cache, idempotency_cache, suggest_cache
+from app.db import pool_status
+from app.query_log import query_stats
+
+# Cross-tenant operational data: only allowlisted (operations) keys may read it
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_internal_key)])
+
+@router.get("/cache-stats")
+def cache_stats():
+    """Hit/miss/eviction counters for the in-process caches of this worker"""
+    return {
+        "api_keys": api_key_cache.stats(),
+        "counts": count_cache.stats(),
+        "suggest": suggest_cache.stats(),
+        "idempotency": idempotency_cache.stats(),
+    }
+
+@router.get("/pool")
+def pool_stats():
+    """Connection pool occupancy, checkout wait histogram and timeouts for this worker"""
+    return pool_status()
+
+@router.get("/slow-queries")
+def slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: Literal["total_ms", "max_ms", "calls", "slow_calls"] = "total_ms",
+):
+    """Top-N statements by time for this worker, plus routes flagged for excessive statement counts"""
+    return query_stats.stats(limit, order_by)
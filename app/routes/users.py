@@ -1,16 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db
 from app.schemas import UserCreate, UserOut
 from app import crud
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(payload: UserCreate, db: Session = Depends(get_db)):
-    # unique email
-    existing = crud.get_user_by_email(db, payload.email)
-    if existing:
+async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # unique email, enforced by the insert itself
+    user = await crud.create_user(db, email=payload.email, full_name=payload.full_name)
+    if user is None:
         raise HTTPException(status_code=409, detail="Email already exists")
-    user = crud.create_user(db, email=payload.email, full_name=payload.full_name)
-    return user
\ No newline at end of file
+    return user
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, EmailStr, Field
 from enum import Enum
 
@@ -11,6 +11,22 @@ class ApplicationStatus(str, Enum):
     offer = "offer"
     archived = "archived"
 
+class TotalMode(str, Enum):
+    """How the listing total is computed"""
+    exact = "exact"        # COUNT(*), cached per user/status
+    estimate = "estimate"  # planner estimate on Postgres
+    none = "none"          # skip the count entirely
+
+class ExportFormat(str, Enum):
+    """Output format of the application export"""
+    ndjson = "ndjson"
+    csv = "csv"
+
+class SuggestField(str, Enum):
+    """Application fields that support autocomplete"""
+    company = "company"
+    role_title = "role_title"
+
 # ===== USER SCHEMAS =====
 class UserCreate(BaseModel):
     """Schema for creating a new user (request body)"""
@@ -56,12 +72,43 @@ class ApplicationOut(BaseModel):
     class Config:
         from_attributes = True  # Allows conversion from SQLAlchemy model
 
+class ApplicationStatusUpdate(BaseModel):
+    """Schema for changing an application's status"""
+    status: ApplicationStatus
+
+class ApplicationStats(BaseModel):
+    """Schema for per-status application counts of a user"""
+    user_id: int
+    counts: Dict[ApplicationStatus, int]
+    total: int
+
+class Suggestions(BaseModel):
+    """Schema for autocomplete results, most used first"""
+    field: SuggestField
+    prefix: str
+    suggestions: List[str]
+
+class BulkItemResult(BaseModel):
+    """Outcome for one item of a bulk import, by position in the request"""
+    index: int
+    status: str  # "created", "duplicate" (id of the existing application) or "error"
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    """Schema for bulk import response"""
+    created: int
+    duplicates: int = 0
+    failed: int
+    results: List[BulkItemResult]
+
 class ApplicationsList(BaseModel):
     """Schema for paginated list of applications"""
     items: List[ApplicationOut]
-    total: int
+    total: Optional[int]  # null when include_total=none
     limit: int
     offset: int
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for keyset paging
 
 # ===== API KEY SCHEMAS =====
 class ApiKeyCreate(BaseModel):
@@ -0,0 +1,79 @@
+"""
+Full-text search over applications.company, role_title and notes.
+
+Postgres: ``applications.search_vector`` is a generated, weighted tsvector with a
+GIN index (see the alembic revision adding it); it is kept off the ORM model so
+SQLite's create_all never sees the type. Queries use websearch_to_tsquery and
+rank with ts_rank_cd.
+
+SQLite (test/local mode): an external-content FTS5 table ``applications_fts``
+kept in step by triggers, ranked with bm25. Each search term is matched as a
+prefix and terms are ANDed.
+"""
+import re
+from typing import Tuple
+from sqlalchemy import Connection, ColumnElement, Select, column, false, func, literal_column, table, text
+from app.models import Application
+
+SEARCH_CONFIG = "english"
+
+SQLITE_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS applications_fts USING fts5(
+        company, role_title, notes, content='applications', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS applications_fts_ai AFTER INSERT ON applications BEGIN
+        INSERT INTO applications_fts(rowid, company, role_title, notes)
+        VALUES (new.id, new.company, new.role_title, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS applications_fts_ad AFTER DELETE ON applications BEGIN
+        INSERT INTO applications_fts(applications_fts, rowid, company, role_title, notes)
+        VALUES ('delete', old.id, old.company, old.role_title, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS applications_fts_au AFTER UPDATE OF company, role_title, notes ON applications BEGIN
+        INSERT INTO applications_fts(applications_fts, rowid, company, role_title, notes)
+        VALUES ('delete', old.id, old.company, old.role_title, old.notes);
+        INSERT INTO applications_fts(rowid, company, role_title, notes)
+        VALUES (new.id, new.company, new.role_title, new.notes);
+    END
+    """,
+)
+
+def install_sqlite_fts(conn: Connection) -> None:
+    """Create the FTS5 table and triggers if missing, indexing existing rows on first creation"""
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'applications_fts'")
+    ).first()
+    for ddl in SQLITE_FTS_DDL:
+        conn.execute(text(ddl))
+    if not exists:
+        conn.execute(text("INSERT INTO applications_fts(applications_fts) VALUES ('rebuild')"))
+
+_fts_table = table("applications_fts", column("rowid"))
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+def fts5_query(q: str) -> str:
+    """Turn free text into a safe FTS5 MATCH expression: every word as a quoted prefix term"""
+    return " ".join(f'"{term}"*' for term in _TERM.findall(q))
+
+def apply_search(stmt: Select, dialect: str, q: str) -> Tuple[Select, ColumnElement]:
+    """Restrict an applications select to rows matching ``q``; returns it with a best-first order key"""
+    if dialect == "postgresql":
+        vector = literal_column("applications.search_vector")
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        return stmt.where(vector.op("@@")(query)), func.ts_rank_cd(vector, query).desc()
+    match = fts5_query(q)
+    if not match:
+        # No searchable terms (only punctuation): nothing can match
+        return stmt.where(false()), Application.id.desc()
+    fts = literal_column("applications_fts")
+    stmt = stmt.join(_fts_table, _fts_table.c.rowid == Application.id).where(fts.op("MATCH")(match))
+    # bm25() is lower-is-better; a hit in company outranks role_title, which outranks notes
+    return stmt, func.bm25(fts, 10.0, 5.0, 1.0).asc()
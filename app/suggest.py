@@ -0,0 +1,46 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+def _keys(value: str) -> List[Tuple[str, str]]:
+    """
+    Lookup keys for a value: its lowercased text from the start and after every space.
+    These are the word boundaries of the SQL fallback (LIKE 'p%' OR LIKE '% p%'), so
+    "Co-op" is one word on both paths.
+    """
+    lowered = value.lower()
+    starts = [0, *(i + 1 for i, char in enumerate(lowered) if char == " ")]
+    return [(lowered[start:], value) for start in starts]
+
+class SuggestionIndex:
+    """
+    Distinct values of one field for one user, with row counts.
+    A sorted array of (lowercased word-suffix, value) keys answers "any word starts
+    with prefix" by binary search, and takes single inserts without a rebuild.
+    """
+    __slots__ = ("counts", "_keys")
+
+    def __init__(self, counts: Dict[str, int]):
+        self.counts = dict(counts)
+        self._keys = sorted(key for value in self.counts for key in _keys(value))
+
+    def add(self, values: Iterable[str]) -> None:
+        for value in values:
+            if value in self.counts:
+                self.counts[value] += 1
+                continue
+            self.counts[value] = 1
+            for key in _keys(value):
+                insort(self._keys, key)
+
+    def lookup(self, prefix: str, limit: int) -> List[str]:
+        """Values with a word starting with ``prefix`` (case-insensitive), most used first"""
+        prefix = prefix.lower()
+        matches = set()
+        i = bisect_left(self._keys, (prefix, ""))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+            matches.add(self._keys[i][1])
+            i += 1
+        return sorted(matches, key=lambda v: (-self.counts[v], v.lower()))[:limit]
+
+# Stored in suggest_cache instead of an index for users with too many distinct values
+TOO_MANY_VALUES = object()
@@ -0,0 +1,145 @@
+"""
+Opt-in per-request timing breakdown.
+
+When SERVER_TIMING_SAMPLE_RATE > 0, a sampled fraction of requests collect the
+time spent in auth, signature verification, rate limiting and each SQL
+statement. The breakdown is returned in a ``Server-Timing`` header and logged
+as structured fields. Unsampled requests only pay a ContextVar lookup in the
+instrumented functions; with a rate of 0 the middleware and engine listeners
+are not installed at all.
+"""
+import functools
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_ENTRIES = 20
+
+class RequestTimings:
+    """Phase durations (ms) collected for one sampled request"""
+    __slots__ = ("phases", "statements")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.statements: List[Tuple[str, float]] = []
+
+    def add(self, name: str, ms: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    def header_value(self, total_ms: float) -> str:
+        parts = [f"{name};dur={ms:.2f}" for name, ms in self.phases.items()]
+        for i, (statement, ms) in enumerate(self.statements[:MAX_SQL_ENTRIES], 1):
+            parts.append(f'sql{i};dur={ms:.2f};desc="{_describe(statement)}"')
+        parts.append(f"total;dur={total_ms:.2f}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def _describe(statement: str) -> str:
+    """Short, header-safe label for a SQL statement (e.g. 'SELECT applications.id, ...')"""
+    text = " ".join(statement.split())[:48]
+    return text.replace('"', "'").replace("\\", "")
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as ``name`` if the current request is sampled"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+def timed(name: str):
+    """Decorator for async functions/dependencies, timed as ``name`` when sampled"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return await fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                timings.add(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("server_timing_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    starts = conn.info.get("server_timing_start")
+    if timings is None or not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    timings.add("db", ms)
+    timings.statements.append((statement, ms))
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the SQL timing listeners to a (sync) engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def uninstrument_engine(engine: Engine) -> None:
+    """Detach the listeners added by instrument_engine"""
+    event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware that samples requests and emits their Server-Timing breakdown"""
+
+    def __init__(self, app: ASGIApp, sample_rate: float):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+        
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def timing_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header_value(total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, timing_send)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            logger.info(
+                "request timing",
+                extra={
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status_code,
+                    "total_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "timings_ms": {name: round(ms, 3) for name, ms in timings.phases.items()},
+                    "sql_statements": len(timings.statements),
+                },
+            )
@@ -0,0 +1,70 @@
+"""
+Latency of the authenticated request path under concurrency.
+
+Drives ``GET /api/applications`` in-process through ``httpx.ASGITransport`` with
+N concurrent clients and reports throughput plus p50/p95/p99. Run it on two
+commits (e.g. before and after moving auth onto the async session) and compare
+the JSON output:
+
+    python -m benchmarks.bench_auth_latency --concurrency 50 --requests 2000 -o after.json
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+# Keep benchmark rows out of the repo's SQLite file (set SQLITE_PATH to override)
+os.environ.setdefault("SQLITE_PATH", "/tmp/lijoa-bench-auth.db")
+
+from app.main import app
+from benchmarks.common import create_user_and_key, emit, git_revision, summarize
+
+
+async def run(concurrency: int, total: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        creds = await create_user_and_key(client)
+        headers = {"X-API-Key": creds["token"]}
+        url = f"/api/applications?user_id={creds['user_id']}&limit=20"
+        await client.post(
+            "/api/applications",
+            headers=headers,
+            json={"user_id": creds["user_id"], "company": "BenchCo", "role_title": "Engineer"},
+        )
+
+        latencies = []
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                r = await client.get(url, headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if r.status_code != 200:
+                    raise RuntimeError(f"unexpected status {r.status_code}: {r.text}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "benchmark": "auth_latency",
+        "revision": git_revision(),
+        "concurrency": concurrency,
+        **summarize(latencies, elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("-o", "--output", default=None, help="write JSON result to this file")
+    args = parser.parse_args()
+    emit(asyncio.run(run(args.concurrency, args.requests)), args.output)
+
+
+if __name__ == "__main__":
+    main()
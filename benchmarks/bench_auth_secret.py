@@ -0,0 +1,42 @@
+"""
+Per-request cost of API key secret verification.
+
+Compares the old scheme (Fernet-decrypt the stored secret, then compare) with
+the stored peppered HMAC digest used by require_api_key:
+
+    python -m benchmarks.bench_auth_secret --iterations 100000
+"""
+import argparse
+import hmac
+import timeit
+
+from app.auth import decrypt_secret, encrypt_secret, hash_secret, make_api_key_pair
+from benchmarks.common import emit, git_revision
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("-o", "--output", default=None, help="write JSON result to this file")
+    args = parser.parse_args()
+
+    _, secret, _ = make_api_key_pair()
+    secret_enc = encrypt_secret(secret)
+    secret_hash = hash_secret(secret)
+
+    def fernet_verify():
+        return hmac.compare_digest(decrypt_secret(secret_enc), secret)
+
+    def hash_verify():
+        return hmac.compare_digest(secret_hash, hash_secret(secret))
+
+    result = {"benchmark": "auth_secret", "revision": git_revision(), "iterations": args.iterations}
+    for name, fn in (("fernet_decrypt", fernet_verify), ("hmac_digest", hash_verify)):
+        seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+        result[f"{name}_us"] = round(seconds / args.iterations * 1e6, 3)
+    result["speedup"] = round(result["fernet_decrypt_us"] / result["hmac_digest_us"], 1)
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Cost of building one GET /api/applications page: ORM + Pydantic vs columns + orjson.
+
+Seeds one user with ``--limit`` applications (with notes and job_url filled in)
+and times, per page:
+
+* ``orm_pydantic``: ``select(Application)`` entities validated through
+  ``ApplicationsList`` (from_attributes) and rendered by ``JSONResponse`` --
+  what FastAPI did for the endpoint before the fast path.
+* ``columns_orjson``: ``crud.list_applications`` column rows turned into dicts
+  and rendered by ``FastJSONResponse`` -- the current endpoint.
+* ``projected``: the same with ``fields=`` (default ``id,company,role_title,status``),
+  as a summary table would request it.
+
+Both query and serialization time are included; ``*_serialize`` isolates the
+latter. Rows go to a scratch database under /tmp unless SQLITE_PATH is set:
+
+    python -m benchmarks.bench_list_serialization --limit 100
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import desc, insert, select
+
+# Keep benchmark rows out of the repo's SQLite file (set SQLITE_PATH to override)
+os.environ.setdefault("SQLITE_PATH", "/tmp/lijoa-bench-list.db")
+
+from app import crud
+from app.db import AsyncSessionLocal, SessionLocal
+from app.models import Application, ApplicationStatus, User
+from app.responses import FastJSONResponse
+from app.schemas import ApplicationsList
+from benchmarks.common import emit, git_revision, summarize
+
+
+def seed(rows: int) -> int:
+    with SessionLocal() as s:
+        user = User(email=f"bench-{uuid.uuid4().hex[:10]}@example.com", full_name="Bench")
+        s.add(user)
+        s.flush()
+        base = datetime.utcnow()
+        s.execute(
+            insert(Application),
+            [
+                {
+                    "user_id": user.id,
+                    "company": f"Company {i}",
+                    "role_title": "Senior Backend Engineer",
+                    "source": "linkedin",
+                    "status": ApplicationStatus.APPLIED,
+                    "job_url": f"https://jobs.example.com/postings/{uuid.uuid4().hex}",
+                    "notes": "Recruiter call scheduled; follow up after the take-home. " * 4,
+                    "created_at": base - timedelta(seconds=i),
+                    "updated_at": base,
+                }
+                for i in range(rows)
+            ],
+        )
+        s.commit()
+        return user.id
+
+
+async def orm_pydantic(db, user_id: int, limit: int):
+    rows = (await db.scalars(
+        select(Application)
+        .where(Application.user_id == user_id)
+        .order_by(desc(Application.created_at), desc(Application.id))
+        .limit(limit)
+    )).all()
+    started = time.perf_counter()
+    payload = {"items": rows, "total": None, "limit": limit, "offset": 0, "next_cursor": None}
+    content = ApplicationsList.model_validate(payload).model_dump(mode="json")
+    body = JSONResponse(content).body
+    return body, time.perf_counter() - started
+
+
+async def columns_orjson(db, user_id: int, limit: int, columns=crud.LIST_COLUMNS):
+    rows, total, next_cursor = await crud.list_applications(
+        db, user_id=user_id, status=None, limit=limit, offset=0, total_mode="none", columns=columns,
+    )
+    started = time.perf_counter()
+    content = {
+        "items": [dict(zip(columns, row)) for row in rows],
+        "total": total, "limit": limit, "offset": 0, "next_cursor": next_cursor,
+    }
+    body = FastJSONResponse(content).body
+    return body, time.perf_counter() - started
+
+
+async def time_path(fn, user_id: int, limit: int, repeat: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        await fn(db, user_id, limit)  # warm-up
+        latencies, serialize = [], []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body, serialize_s = await fn(db, user_id, limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+            serialize.append(serialize_s * 1000)
+            db.expunge_all()
+        elapsed = time.perf_counter() - started
+    return {
+        "page": summarize(latencies, elapsed),
+        "serialize": summarize(serialize, sum(serialize) / 1000),
+        "body_bytes": len(body),
+    }
+
+
+async def run(limit: int, repeat: int, fields: str) -> dict:
+    user_id = seed(limit)
+    columns = tuple(fields.split(","))
+
+    async def projected(db, user_id: int, limit: int):
+        return await columns_orjson(db, user_id, limit, columns)
+
+    result = {"benchmark": "list_serialization", "revision": git_revision(), "limit": limit, "fields": fields}
+    for name, fn in (("orm_pydantic", orm_pydantic), ("columns_orjson", columns_orjson), ("projected", projected)):
+        timings = await time_path(fn, user_id, limit, repeat)
+        result[name] = timings["page"]
+        result[f"{name}_serialize"] = timings["serialize"]
+        result[f"{name}_body_bytes"] = timings["body_bytes"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--fields", default="id,company,role_title,status", help="projection for the projected path")
+    parser.add_argument("-o", "--output", default=None, help="write JSON result to this file")
+    args = parser.parse_args()
+    emit(asyncio.run(run(args.limit, args.repeat, args.fields)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-request cost of MetricsMiddleware.
+
+Times a trivial ASGI app called directly and through MetricsMiddleware; the
+difference is the recording overhead per request:
+
+    python -m benchmarks.bench_metrics_overhead --iterations 200000
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.metrics import MetricsMiddleware
+from benchmarks.common import emit, git_revision
+
+ROUTE = SimpleNamespace(path="/api/applications")
+
+
+async def noop_app(scope, receive, send):
+    scope["route"] = ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def time_app(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/applications"}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("-o", "--output", default=None, help="write JSON result to this file")
+    args = parser.parse_args()
+
+    async def run():
+        instrumented = MetricsMiddleware(noop_app)
+        await time_app(instrumented, 1000)  # warm up label children
+        bare = min([await time_app(noop_app, args.iterations) for _ in range(3)])
+        wrapped = min([await time_app(instrumented, args.iterations) for _ in range(3)])
+        return bare, wrapped
+
+    bare, wrapped = asyncio.run(run())
+    emit({
+        "benchmark": "metrics_overhead",
+        "revision": git_revision(),
+        "iterations": args.iterations,
+        "bare_us": round(bare, 3),
+        "instrumented_us": round(wrapped, 3),
+        "overhead_us": round(wrapped - bare, 3),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
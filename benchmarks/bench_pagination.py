@@ -0,0 +1,101 @@
+"""
+Deep-page latency of GET /api/applications: OFFSET vs keyset cursor.
+
+Seeds one user with ``--pages * --limit`` applications, then times
+``crud.list_applications`` for page ``--pages`` in offset mode and in cursor
+mode. Rows go to a scratch database under /tmp unless SQLITE_PATH is set:
+
+    python -m benchmarks.bench_pagination --pages 500
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import desc, insert, select
+
+# Keep benchmark rows out of the repo's SQLite file (set SQLITE_PATH to override)
+os.environ.setdefault("SQLITE_PATH", "/tmp/lijoa-bench-pagination.db")
+
+from app import crud
+from app.db import AsyncSessionLocal, SessionLocal
+from app.etag import listing_versions
+from app.models import Application, ApplicationStatus, User
+from benchmarks.common import emit, git_revision, summarize
+
+
+def seed(rows: int) -> int:
+    with SessionLocal() as s:
+        user = User(email=f"bench-{uuid.uuid4().hex[:10]}@example.com", full_name="Bench")
+        s.add(user)
+        s.flush()
+        base = datetime.utcnow()
+        s.execute(
+            insert(Application),
+            [
+                {
+                    "user_id": user.id,
+                    "company": f"Company {i}",
+                    "role_title": "Engineer",
+                    "status": ApplicationStatus.APPLIED,
+                    "created_at": base - timedelta(seconds=i),
+                    "updated_at": base,
+                }
+                for i in range(rows)
+            ],
+        )
+        s.commit()
+        return user.id
+
+
+async def time_mode(user_id: int, limit: int, page: int, repeat: int, keyset: bool) -> list:
+    offset = (page - 1) * limit
+    async with AsyncSessionLocal() as db:
+        cursor = None
+        if keyset:
+            # The cursor a client would hold after reading page - 1
+            last = (await db.execute(
+                select(Application.created_at, Application.id)
+                .where(Application.user_id == user_id)
+                .order_by(desc(Application.created_at), desc(Application.id))
+                .offset(offset - 1).limit(1)
+            )).one()
+            cursor = (last.created_at, last.id)
+        # Totals are cached per listing version, as the endpoint does
+        version = await listing_versions.current(user_id)
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows, _, _ = await crud.list_applications(
+                db, user_id=user_id, status=None, limit=limit,
+                offset=0 if keyset else offset, cursor=cursor, version=version,
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert len(rows) == limit
+    return latencies
+
+
+async def run(pages: int, limit: int, repeat: int) -> dict:
+    user_id = seed(pages * limit)
+    result = {"benchmark": "pagination", "revision": git_revision(), "page": pages, "limit": limit}
+    for mode, keyset in (("offset", False), ("cursor", True)):
+        started = time.perf_counter()
+        latencies = await time_mode(user_id, limit, pages, repeat, keyset)
+        result[mode] = summarize(latencies, time.perf_counter() - started)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("-o", "--output", default=None, help="write JSON result to this file")
+    args = parser.parse_args()
+    emit(asyncio.run(run(args.pages, args.limit, args.repeat)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Shared helpers for the benchmark scripts in this package."""
+import json
+import math
+import os
+import statistics
+import subprocess
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 < pct <= 100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies_ms: List[float], elapsed_s: float) -> Dict[str, float]:
+    """Summarize a run as throughput plus latency percentiles (milliseconds)."""
+    return {
+        "requests": len(latencies_ms),
+        "throughput_rps": round(len(latencies_ms) / elapsed_s, 1) if elapsed_s else 0.0,
+        "mean_ms": round(statistics.fmean(latencies_ms), 3) if latencies_ms else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms), 3) if latencies_ms else 0.0,
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Short git revision of the working tree, if available."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+async def create_user_and_key(client: httpx.AsyncClient) -> Dict[str, object]:
+    """Create a throwaway user plus API key and return ``{"user_id", "token"}``."""
+    r = await client.post(
+        "/users",
+        json={"email": f"bench-{uuid.uuid4().hex[:10]}@example.com", "full_name": "Bench"},
+    )
+    r.raise_for_status()
+    user_id = r.json()["id"]
+    r = await client.post("/api-keys", json={"user_id": user_id, "name": "bench"})
+    r.raise_for_status()
+    return {"user_id": user_id, "token": r.json()["token"]}
+
+
+def emit(result: Dict[str, object], output: Optional[str]) -> None:
+    """Print ``result`` as JSON and optionally write it to ``output``."""
+    text = json.dumps(result, indent=2, default=str)
+    print(text)
+    if output:
+        with open(output, "w") as fh:
+            fh.write(text + "\n")
@@ -0,0 +1,300 @@
+"""
+End-to-end load test of the public and authenticated API paths.
+
+Starts a local uvicorn (unless ``--base-url`` is given), seeds ``--users`` users
+with one API key and ``--apps-per-user`` applications each, then drives every
+scenario at each ``--concurrency`` level over real HTTP and reports throughput
+plus p50/p95/p99 per (scenario, concurrency). Everything runs offline: the
+spawned server uses APP_ENV=test (no Redis) against SQLITE_PATH, or against
+Postgres when APP_ENV/POSTGRES_* are set in the environment. Rate limiting is
+disabled in the spawned server so the numbers measure the request path itself.
+
+    SQLITE_PATH=/tmp/loadtest.db python -m benchmarks.loadtest --concurrency 1,10,50 -o before.json
+    python -m benchmarks.loadtest --compare before.json -o after.json
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import emit, git_revision, summarize
+
+SCENARIOS = (
+    "create_user",
+    "create_api_key",
+    "create_application",
+    "create_application_signed",
+    "list_applications",
+    "list_applications_signed",
+)
+
+# Signature timestamps must be within this many seconds of the server clock
+TS_WINDOW = 290
+
+
+class Credential:
+    """A seeded user and API key. Hands out unique signature timestamps so that
+    repeated identical signed requests are not rejected by the replay guard."""
+
+    def __init__(self, user_id: int, token: str):
+        self.user_id = user_id
+        self.token = token
+        self.secret = token.split(".", 1)[1]
+        self._next_ts = int(time.time()) - TS_WINDOW
+
+    def take_ts(self) -> Optional[int]:
+        now = int(time.time())
+        self._next_ts = max(self._next_ts, now - TS_WINDOW)
+        if self._next_ts > now + TS_WINDOW:
+            return None
+        ts = self._next_ts
+        self._next_ts += 1
+        return ts
+
+    def sign(self, method: str, path: str, body: bytes) -> Optional[Dict[str, str]]:
+        ts = self.take_ts()
+        if ts is None:
+            return None
+        to_sign = f"{method}\n{path}\n{ts}\n".encode() + body
+        return {
+            "X-API-Key": self.token,
+            "X-Timestamp": str(ts),
+            "X-Signature": hmac.new(self.secret.encode(), to_sign, hashlib.sha256).hexdigest(),
+        }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {
+        "APP_ENV": "test",
+        "SQLITE_PATH": "/tmp/lijoa-loadtest.db",
+        **os.environ,
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not become healthy within 30s")
+
+
+async def seed(client: httpx.AsyncClient, users: int, apps_per_user: int) -> List[Credential]:
+    run_id = uuid.uuid4().hex[:8]
+
+    async def one(i: int) -> Credential:
+        r = await client.post("/users", json={"email": f"load-{run_id}-{i}@example.com", "full_name": "Load"})
+        r.raise_for_status()
+        user_id = r.json()["id"]
+        r = await client.post("/api-keys", json={"user_id": user_id, "name": "load"})
+        r.raise_for_status()
+        cred = Credential(user_id, r.json()["token"])
+        for start in range(0, apps_per_user, 1000):
+            items = [
+                {"user_id": user_id, "company": f"Company {n}", "role_title": "Engineer", "source": "loadtest"}
+                for n in range(start, min(start + 1000, apps_per_user))
+            ]
+            r = await client.post("/api/applications/bulk", headers={"X-API-Key": cred.token}, json=items)
+            r.raise_for_status()
+        return cred
+
+    sem = asyncio.Semaphore(10)
+
+    async def bounded(i: int) -> Credential:
+        async with sem:
+            return await one(i)
+
+    return list(await asyncio.gather(*(bounded(i) for i in range(users))))
+
+
+def build_request(scenario: str, creds: List[Credential], i: int) -> Optional[Tuple[str, str, Dict, Optional[bytes]]]:
+    """Return (method, url, headers, body) for request ``i`` of ``scenario``"""
+    cred = creds[i % len(creds)]
+    if scenario == "create_user":
+        body = {"email": f"load-{uuid.uuid4().hex}@example.com", "full_name": "Load"}
+        return "POST", "/users", {}, json.dumps(body).encode()
+    if scenario == "create_api_key":
+        return "POST", "/api-keys", {}, json.dumps({"user_id": cred.user_id, "name": "load"}).encode()
+    if scenario.startswith("create_application"):
+        body = json.dumps({"user_id": cred.user_id, "company": f"Load {i}", "role_title": "Engineer"}).encode()
+        path = "/api/applications"
+        if scenario.endswith("_signed"):
+            headers = cred.sign("POST", path, body)
+            return None if headers is None else ("POST", path, headers, body)
+        return "POST", path, {"X-API-Key": cred.token}, body
+    path = "/api/applications"
+    url = f"{path}?user_id={cred.user_id}&limit=20"
+    if scenario.endswith("_signed"):
+        headers = cred.sign("GET", path, b"")
+        return None if headers is None else ("GET", url, headers, None)
+    return "GET", url, {"X-API-Key": cred.token}, None
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: str,
+    creds: List[Credential],
+    concurrency: int,
+    total: int,
+) -> Dict[str, object]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for i in remaining:
+            req = build_request(scenario, creds, i)
+            if req is None:
+                errors["no_signature_timestamp"] = errors.get("no_signature_timestamp", 0) + 1
+                continue
+            method, url, headers, body = req
+            if body is not None:
+                headers = {**headers, "Content-Type": "application/json"}
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, url, headers=headers, content=body)
+                status = str(r.status_code)
+            except httpx.HTTPError as exc:
+                status = exc.__class__.__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not status.startswith("2"):
+                errors[status] = errors.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"scenario": scenario, "concurrency": concurrency, **summarize(latencies, elapsed), "errors": errors}
+
+
+async def run(args, base_url: str) -> Dict[str, object]:
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 10, max_keepalive_connections=max(args.concurrency) + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        seed_started = time.perf_counter()
+        creds = await seed(client, args.users, args.apps_per_user)
+        seed_s = time.perf_counter() - seed_started
+
+        results = []
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                # Short warm-up so connection setup is not counted
+                await run_scenario(client, scenario, creds, concurrency, min(args.requests, concurrency * 2))
+                result = await run_scenario(client, scenario, creds, concurrency, args.requests)
+                print(
+                    f"{scenario:<28} c={concurrency:<4} {result['throughput_rps']:>9} rps  "
+                    f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms",
+                    file=sys.stderr,
+                )
+                results.append(result)
+
+    return {
+        "benchmark": "loadtest",
+        "revision": git_revision(),
+        "target": base_url,
+        "config": {
+            "users": args.users,
+            "apps_per_user": args.apps_per_user,
+            "requests": args.requests,
+            "workers": args.workers,
+            "seed_seconds": round(seed_s, 2),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, object], baseline_path: str) -> List[Dict[str, object]]:
+    """Relative change of throughput and p95 against a previous result file"""
+    with open(baseline_path) as fh:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(fh)["results"]}
+
+    def change(new: float, old: float) -> Optional[float]:
+        return round((new - old) / old * 100, 1) if old else None
+
+    rows = []
+    for r in current["results"]:
+        old = baseline.get((r["scenario"], r["concurrency"]))
+        if old is None:
+            continue
+        rows.append({
+            "scenario": r["scenario"],
+            "concurrency": r["concurrency"],
+            "throughput_change_pct": change(r["throughput_rps"], old["throughput_rps"]),
+            "p95_change_pct": change(r["p95_ms"], old["p95_ms"]),
+            "p99_change_pct": change(r["p99_ms"], old["p99_ms"]),
+        })
+    return rows
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _scenario_list(value: str) -> List[str]:
+    names = [v for v in value.split(",") if v]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return names
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="target an already running server instead of spawning uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned server")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--apps-per-user", type=int, default=100)
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 10, 50], help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario and level")
+    parser.add_argument("--scenarios", type=_scenario_list, default=list(SCENARIOS), help="comma-separated subset")
+    parser.add_argument("--compare", default=None, help="previous JSON result to diff against")
+    parser.add_argument("-o", "--output", default=None, help="write JSON result to this file")
+    args = parser.parse_args(argv)
+
+    proc = None
+    base_url = args.base_url
+    if base_url is None:
+        proc, base_url = start_server(args.workers)
+    try:
+        result = asyncio.run(run(args, base_url))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+    if args.compare:
+        result["comparison"] = {"baseline": args.compare, "changes": compare(result, args.compare)}
+    emit(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
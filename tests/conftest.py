@@ -0,0 +1,10 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Point the app at a throwaway SQLite file before any test module imports it,
+# so test runs never touch (or depend on the schema of) a developer's ./test.db
+_tmpdir = tempfile.mkdtemp(prefix="lijoa-tests-")
+atexit.register(shutil.rmtree, _tmpdir, ignore_errors=True)
+os.environ.setdefault("SQLITE_PATH", os.path.join(_tmpdir, "test.db"))
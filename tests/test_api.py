@@ -1,3 +1,4 @@
+import json
 import os
 import uuid
 from fastapi.testclient import TestClient
@@ -186,4 +187,550 @@ def test_application_validation():
     response = client.post("/api/applications", json=app_data, headers={"X-API-Key": token})
     assert response.status_code == 422  # Validation error
     
-    print("Successfully tested application input validation")
\ No newline at end of file
+    print("Successfully tested application input validation")
+
+def test_list_applications_cursor_pagination():
+    """Test keyset pagination with next_cursor"""
+    user_data = {"email": generate_unique_email(), "full_name": "Cursor Test"}
+    response = client.post("/users", json=user_data)
+    user_id = response.json()["id"]
+    
+    key_data = {"user_id": user_id, "name": "test-key"}
+    response = client.post("/api-keys", json=key_data)
+    token = response.json()["token"]
+    headers = {"X-API-Key": token}
+    
+    for company in ("Company A", "Company B", "Company C"):
+        response = client.post("/api/applications", json={"user_id": user_id, "company": company, "role_title": "Role"}, headers=headers)
+        assert response.status_code == 201
+    
+    # First page hands out a cursor
+    response = client.get(f"/api/applications?user_id={user_id}&limit=2", headers=headers)
+    assert response.status_code == 200
+    first = response.json()
+    assert len(first["items"]) == 2
+    assert first["next_cursor"]
+    
+    # Cursor page continues exactly where the first page stopped
+    response = client.get(f"/api/applications?user_id={user_id}&limit=2&cursor={first['next_cursor']}", headers=headers)
+    assert response.status_code == 200
+    second = response.json()
+    assert len(second["items"]) == 1
+    assert second["next_cursor"] is None
+    seen = {item["id"] for item in first["items"]} | {item["id"] for item in second["items"]}
+    assert len(seen) == 3
+    
+    # Offset mode returns the same rows
+    response = client.get(f"/api/applications?user_id={user_id}&limit=2&offset=2", headers=headers)
+    assert [item["id"] for item in response.json()["items"]] == [item["id"] for item in second["items"]]
+    
+    # Malformed cursors are rejected
+    response = client.get(f"/api/applications?user_id={user_id}&cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400
+
+def test_list_applications_total_modes():
+    """Test include_total switch and cached totals staying fresh after writes"""
+    user_data = {"email": generate_unique_email(), "full_name": "Total Test"}
+    response = client.post("/users", json=user_data)
+    user_id = response.json()["id"]
+    
+    key_data = {"user_id": user_id, "name": "test-key"}
+    response = client.post("/api-keys", json=key_data)
+    headers = {"X-API-Key": response.json()["token"]}
+    
+    app_data = {"user_id": user_id, "company": "Company A", "role_title": "Role A"}
+    assert client.post("/api/applications", json=app_data, headers=headers).status_code == 201
+    
+    response = client.get(f"/api/applications?user_id={user_id}", headers=headers)
+    assert response.json()["total"] == 1
+    
+    # A write must invalidate the cached exact total
+    assert client.post("/api/applications", json=app_data, headers=headers).status_code == 201
+    response = client.get(f"/api/applications?user_id={user_id}&include_total=exact", headers=headers)
+    assert response.json()["total"] == 2
+    
+    response = client.get(f"/api/applications?user_id={user_id}&include_total=none", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["total"] is None
+    assert len(response.json()["items"]) == 2
+    
+    # SQLite has no planner estimate, so estimate falls back to the exact count
+    response = client.get(f"/api/applications?user_id={user_id}&include_total=estimate", headers=headers)
+    assert response.json()["total"] == 2
+
+def test_list_applications_unfiltered_total():
+    """Listings without user/status filters still count every application"""
+    from sqlalchemy import func, select
+    from app.db import SessionLocal
+    from app.models import Application
+    
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    headers = {"X-API-Key": client.post("/api-keys", json={"user_id": user_id, "name": "all"}).json()["token"]}
+    for i in range(2):
+        client.post("/api/applications", json={"user_id": user_id, "company": f"All {i}", "role_title": "Dev"}, headers=headers)
+    
+    with SessionLocal() as s:
+        expected = s.scalar(select(func.count()).select_from(Application))
+    for mode in ("exact", "estimate"):
+        response = client.get(f"/api/applications?include_total={mode}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] == expected >= 2
+
+def test_application_stats_and_status_change():
+    """Test per-status counts follow creates and status changes"""
+    user_data = {"email": generate_unique_email(), "full_name": "Stats Test"}
+    response = client.post("/users", json=user_data)
+    user_id = response.json()["id"]
+    
+    key_data = {"user_id": user_id, "name": "test-key"}
+    response = client.post("/api-keys", json=key_data)
+    headers = {"X-API-Key": response.json()["token"]}
+    
+    ids = []
+    for status in ("applied", "applied", "interviewing"):
+        app_data = {"user_id": user_id, "company": "Company", "role_title": "Role", "status": status}
+        response = client.post("/api/applications", json=app_data, headers=headers)
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    
+    response = client.get(f"/api/applications/stats?user_id={user_id}", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["counts"] == {"applied": 2, "interviewing": 1, "rejected": 0, "offer": 0, "archived": 0}
+    assert data["total"] == 3
+    
+    # Moving an application between statuses shifts the counts
+    response = client.patch(f"/api/applications/{ids[0]}", json={"status": "offer"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "offer"
+    data = client.get(f"/api/applications/stats?user_id={user_id}", headers=headers).json()
+    assert data["counts"]["applied"] == 1
+    assert data["counts"]["offer"] == 1
+    assert data["total"] == 3
+    
+    response = client.patch("/api/applications/99999999", json={"status": "offer"}, headers=headers)
+    assert response.status_code == 404
+
+def test_bulk_import_applications():
+    """Test bulk import with JSON array and NDJSON bodies"""
+    user_data = {"email": generate_unique_email(), "full_name": "Bulk Test"}
+    response = client.post("/users", json=user_data)
+    user_id = response.json()["id"]
+    
+    key_data = {"user_id": user_id, "name": "test-key"}
+    response = client.post("/api-keys", json=key_data)
+    headers = {"X-API-Key": response.json()["token"]}
+    
+    items = [
+        {"user_id": user_id, "company": "Company A", "role_title": "Role A"},
+        {"user_id": user_id, "company": "", "role_title": "Role B"},  # invalid
+        {"user_id": 99999999, "company": "Company C", "role_title": "Role C"},  # unknown user
+        {"user_id": user_id, "company": "Company D", "role_title": "Role D", "status": "interviewing"},
+    ]
+    response = client.post("/api/applications/bulk", json=items, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 2
+    assert [r["status"] for r in data["results"]] == ["created", "error", "error", "created"]
+    assert "User not found" in data["results"][2]["error"]
+    
+    ndjson = "\n".join(json.dumps(item) for item in (items[0], items[3]))
+    response = client.post(
+        "/api/applications/bulk",
+        content=ndjson,
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+    
+    stats = client.get(f"/api/applications/stats?user_id={user_id}", headers=headers).json()
+    assert stats["counts"]["applied"] == 2
+    assert stats["counts"]["interviewing"] == 2
+    
+    response = client.post("/api/applications/bulk", content="{not json", headers=headers)
+    assert response.status_code == 400
+
+def test_export_applications():
+    """Test streaming export as NDJSON and CSV"""
+    user_data = {"email": generate_unique_email(), "full_name": "Export Test"}
+    response = client.post("/users", json=user_data)
+    user_id = response.json()["id"]
+    
+    key_data = {"user_id": user_id, "name": "test-key"}
+    response = client.post("/api-keys", json=key_data)
+    headers = {"X-API-Key": response.json()["token"]}
+    
+    items = [{"user_id": user_id, "company": f"Company {i}", "role_title": "Role"} for i in range(3)]
+    assert client.post("/api/applications/bulk", json=items, headers=headers).json()["created"] == 3
+    
+    response = client.get(f"/api/applications/export?user_id={user_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["company"] for row in rows] == ["Company 0", "Company 1", "Company 2"]
+    assert rows[0]["status"] == "applied"
+    
+    response = client.get(f"/api/applications/export?user_id={user_id}&format=csv", headers=headers)
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,user_id,company")
+    assert len(lines) == 4
+
+def test_list_applications_etag():
+    """Listings carry an ETag, answer 304 while unchanged and change after writes"""
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "etag"}).json()["token"]
+    headers = {"X-API-Key": token}
+    other_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    
+    response = client.post("/api/applications", json={"user_id": user_id, "company": "Etag Co", "role_title": "Dev"}, headers=headers)
+    app_id = response.json()["id"]
+    url = f"/api/applications?user_id={user_id}"
+    response = client.get(url, headers=headers)
+    etag = response.headers["etag"]
+    assert client.get(url + "&limit=5", headers=headers).headers["etag"] != etag
+    
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    
+    # Writes to another user leave this listing's tag alone
+    client.post("/api/applications", json={"user_id": other_id, "company": "Other", "role_title": "Dev"}, headers=headers)
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+    
+    # Status changes and new applications invalidate it
+    client.patch(f"/api/applications/{app_id}", json={"status": "interviewing"}, headers=headers)
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["status"] == "interviewing"
+    etag = response.headers["etag"]
+    client.post("/api/applications", json={"user_id": user_id, "company": "Etag Two", "role_title": "Dev"}, headers=headers)
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
+
+def test_list_applications_total_tracks_etag():
+    """A total counted before a concurrent write is never served under a later ETag"""
+    import asyncio
+    from app.cache import count_cache
+    from app.etag import listing_versions
+    
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    headers = {"X-API-Key": client.post("/api-keys", json={"user_id": user_id, "name": "total"}).json()["token"]}
+    body = {"user_id": user_id, "company": "Race Co", "role_title": "Dev"}
+    client.post("/api/applications", json=body, headers=headers)
+    url = f"/api/applications?user_id={user_id}"
+    assert client.get(url, headers=headers).json()["total"] == 1
+    
+    # A listing read the version, counted 1, and only stores that count after a create committed
+    version = asyncio.run(listing_versions.current(user_id))
+    client.post("/api/applications", json={**body, "company": "Race Two"}, headers=headers)
+    count_cache.set((user_id, None, version), 1)
+    
+    response = client.get(url, headers=headers)
+    assert len(response.json()["items"]) == 2
+    assert response.json()["total"] == 2
+    assert client.get(url, headers={**headers, "If-None-Match": response.headers["etag"]}).status_code == 304
+
+def test_list_applications_field_projection():
+    """fields= returns only the requested columns and still pages by cursor"""
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "fields"}).json()["token"]
+    headers = {"X-API-Key": token}
+    for company in ("Proj A", "Proj B", "Proj C"):
+        client.post("/api/applications", json={"user_id": user_id, "company": company, "role_title": "Dev", "notes": "long"}, headers=headers)
+    
+    url = f"/api/applications?user_id={user_id}&limit=2&fields=company,status,company"
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["items"] == [{"company": "Proj C", "status": "applied"}, {"company": "Proj B", "status": "applied"}]
+    assert data["next_cursor"]
+    assert response.headers["etag"] != client.get(f"/api/applications?user_id={user_id}&limit=2", headers=headers).headers["etag"]
+    
+    response = client.get(url + f"&cursor={data['next_cursor']}", headers=headers)
+    assert response.json()["items"] == [{"company": "Proj A", "status": "applied"}]
+    
+    response = client.get(f"/api/applications?user_id={user_id}&fields=company,password", headers=headers)
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+def test_list_applications_search():
+    """q= matches company, role_title and notes and ranks company hits first"""
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "search"}).json()["token"]
+    headers = {"X-API-Key": token}
+    for company, role, notes in (
+        ("Acme Robotics", "Backend Engineer", None),
+        ("Globex", "Robotics Engineer", "Referred by a friend"),
+        ("Initech", "Data Analyst", "Mentioned robotics lab in interview"),
+        ("Hooli", "Designer", None),
+    ):
+        client.post("/api/applications", json={"user_id": user_id, "company": company, "role_title": role, "notes": notes}, headers=headers)
+    
+    response = client.get(f"/api/applications?user_id={user_id}&q=robot", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["next_cursor"] is None
+    assert [item["company"] for item in data["items"]] == ["Acme Robotics", "Globex", "Initech"]
+    
+    # Terms are ANDed, punctuation is ignored, and status changes flow through to the index
+    response = client.get(f"/api/applications?user_id={user_id}&q=engineer%20globex%22", headers=headers)
+    assert [item["company"] for item in response.json()["items"]] == ["Globex"]
+    app_id = response.json()["items"][0]["id"]
+    client.patch(f"/api/applications/{app_id}", json={"status": "offer"}, headers=headers)
+    response = client.get(f"/api/applications?user_id={user_id}&q=robotics&status=offer&fields=company", headers=headers)
+    assert response.json()["items"] == [{"company": "Globex"}]
+    
+    response = client.get(f"/api/applications?user_id={user_id}&q=%22%22", headers=headers)
+    assert response.json()["total"] == 0
+    response = client.get(f"/api/applications?user_id={user_id}&q=robot&cursor=abc", headers=headers)
+    assert response.status_code == 400
+
+def test_list_applications_search_estimate_total():
+    """q= with include_total=estimate works, and Postgres' EXPLAIN keeps the search text bound"""
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+    from app import crud
+    from app.models import Application
+    from app.search import apply_search
+    
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    headers = {"X-API-Key": client.post("/api-keys", json={"user_id": user_id, "name": "est"}).json()["token"]}
+    client.post("/api/applications", json={"user_id": user_id, "company": "Estimate Works", "role_title": "Dev"}, headers=headers)
+    response = client.get(f"/api/applications?user_id={user_id}&q=estimate%20:word&include_total=estimate", headers=headers)
+    assert response.status_code == 200
+    response = client.get(f"/api/applications?user_id={user_id}&q=estimate&include_total=estimate", headers=headers)
+    assert response.json()["total"] == 1
+    
+    stmt, _ = apply_search(select(Application.id), "postgresql", "it's :word")
+    compiled = crud.ExplainJSON(stmt).compile(dialect=postgresql.asyncpg.dialect())
+    assert str(compiled).startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert ":word" not in str(compiled)
+    assert "it's :word" in compiled.params.values()
+
+def test_suggest_company_and_role():
+    """Autocomplete matches word prefixes case-insensitively and sees new applications"""
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "suggest"}).json()["token"]
+    headers = {"X-API-Key": token}
+    for company, role in (("Acme Robotics", "Backend Engineer"), ("Acme Robotics", "Data Engineer"), ("Acorn Labs", "Designer")):
+        client.post("/api/applications", json={"user_id": user_id, "company": company, "role_title": role}, headers=headers)
+    
+    url = f"/api/applications/suggest?user_id={user_id}"
+    response = client.get(url + "&field=company&prefix=ac", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"field": "company", "prefix": "ac", "suggestions": ["Acme Robotics", "Acorn Labs"]}
+    assert client.get(url + "&field=company&prefix=ROB", headers=headers).json()["suggestions"] == ["Acme Robotics"]
+    assert client.get(url + "&field=role_title&prefix=eng", headers=headers).json()["suggestions"] == ["Backend Engineer", "Data Engineer"]
+    
+    # The cached index picks up new values without a reload
+    client.post("/api/applications", json={"user_id": user_id, "company": "Robin Health", "role_title": "SRE"}, headers=headers)
+    assert client.get(url + "&field=company&prefix=rob", headers=headers).json()["suggestions"] == ["Acme Robotics", "Robin Health"]
+    
+    response = client.get(url + "&field=notes&prefix=a", headers=headers)
+    assert response.status_code == 422
+
+def test_suggest_falls_back_to_database():
+    """Users over the cache limit are answered by a LIKE query with the same semantics"""
+    from app.config import settings
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "suggest-db"}).json()["token"]
+    headers = {"X-API-Key": token}
+    for company in ("Acme Robotics", "Acme Robotics", "Robin_Health", "Globex"):
+        client.post("/api/applications", json={"user_id": user_id, "company": company, "role_title": "Dev"}, headers=headers)
+    
+    original = settings.SUGGEST_CACHE_MAX_VALUES
+    settings.SUGGEST_CACHE_MAX_VALUES = 1
+    try:
+        url = f"/api/applications/suggest?user_id={user_id}&field=company"
+        assert client.get(url + "&prefix=rob", headers=headers).json()["suggestions"] == ["Acme Robotics", "Robin_Health"]
+        assert client.get(url + "&prefix=robin_", headers=headers).json()["suggestions"] == ["Robin_Health"]
+        assert client.get(url + "&prefix=%25", headers=headers).json()["suggestions"] == []
+    finally:
+        settings.SUGGEST_CACHE_MAX_VALUES = original
+
+def test_suggest_index_and_database_agree():
+    """The cached index and the SQL fallback split words the same way (hyphens, brackets, case)"""
+    from app.cache import suggest_cache
+    from app.config import settings
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    headers = {"X-API-Key": client.post("/api-keys", json={"user_id": user_id, "name": "agree"}).json()["token"]}
+    for company in ("Co-op Bank", "(Acme) Labs", "foo/bar Inc", "Ärzte Netz", "Coral  Reef"):
+        client.post("/api/applications", json={"user_id": user_id, "company": company, "role_title": "Dev"}, headers=headers)
+    
+    url = f"/api/applications/suggest?user_id={user_id}&field=company&prefix="
+    prefixes = ("co", "op", "bank", "(ac", "acme", "bar", "foo/", "är", "ÄR", "reef", " reef")
+    indexed = {p: client.get(url + p, headers=headers).json()["suggestions"] for p in prefixes}
+    assert indexed["co"] == ["Co-op Bank", "Coral  Reef"]
+    assert indexed["op"] == indexed["acme"] == indexed["bar"] == []
+    assert indexed["är"] == indexed["ÄR"] == ["Ärzte Netz"]
+    
+    suggest_cache.invalidate((user_id, "company"))
+    original = settings.SUGGEST_CACHE_MAX_VALUES
+    settings.SUGGEST_CACHE_MAX_VALUES = 1
+    try:
+        queried = {p: client.get(url + p, headers=headers).json()["suggestions"] for p in prefixes}
+    finally:
+        settings.SUGGEST_CACHE_MAX_VALUES = original
+        suggest_cache.invalidate((user_id, "company"))
+    assert queried == indexed
+
+def test_create_application_dedupe_and_idempotency_key():
+    """dedupe=true and Idempotency-Key return the existing application instead of a copy"""
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "dedupe"}).json()["token"]
+    headers = {"X-API-Key": token}
+    body = {"user_id": user_id, "company": "Acme  Corp", "role_title": "Backend Engineer"}
+    
+    first = client.post("/api/applications", json=body, headers=headers)
+    assert first.status_code == 201
+    # Normalized match: case and whitespace do not matter
+    response = client.post("/api/applications?dedupe=true", json={**body, "company": " acme corp"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["id"] == first.json()["id"]
+    # Without dedupe a copy is still allowed
+    assert client.post("/api/applications", json=body, headers=headers).status_code == 201
+    
+    retry = {**headers, "Idempotency-Key": "req-1"}
+    created = client.post("/api/applications", json={**body, "company": "Initech"}, headers=retry)
+    assert created.status_code == 201
+    # Once the stored response has expired, the key column still prevents a second row
+    from app.cache import idempotency_cache
+    idempotency_cache.clear()
+    replay = client.post("/api/applications", json={**body, "company": "Initech"}, headers=retry)
+    assert replay.status_code == 200
+    assert replay.json()["id"] == created.json()["id"]
+    idempotency_cache.clear()
+    response = client.post("/api/applications", json={**body, "company": "Hooli"}, headers=retry)
+    assert response.status_code == 422
+    
+    stats = client.get(f"/api/applications/stats?user_id={user_id}", headers=headers).json()
+    assert stats["total"] == 3
+
+def test_bulk_import_dedupe():
+    """Bulk dedupe matches existing applications and earlier items of the same batch"""
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "bulk-dedupe"}).json()["token"]
+    headers = {"X-API-Key": token}
+    existing = client.post("/api/applications", json={"user_id": user_id, "company": "Globex", "role_title": "SRE"}, headers=headers).json()["id"]
+    
+    items = [
+        {"user_id": user_id, "company": "globex", "role_title": "sre"},
+        {"user_id": user_id, "company": "Umbrella", "role_title": "QA"},
+        {"user_id": user_id, "company": "UMBRELLA", "role_title": "qa "},
+    ]
+    data = client.post("/api/applications/bulk?dedupe=true", json=items, headers=headers).json()
+    assert [r["status"] for r in data["results"]] == ["duplicate", "created", "duplicate"]
+    assert data["results"][0]["id"] == existing
+    assert data["results"][2]["id"] == data["results"][1]["id"]
+    assert (data["created"], data["duplicates"], data["failed"]) == (1, 2, 0)
+    umbrella = data["results"][1]["id"]
+    
+    # Without dedupe copies go in unclaimed, and the claim still answers later dedupe creates
+    data = client.post("/api/applications/bulk", json=items, headers=headers).json()
+    assert data["created"] == 3
+    response = client.post("/api/applications?dedupe=true", json=items[1], headers=headers)
+    assert response.status_code == 200
+    assert response.json()["id"] == umbrella
+    
+    # A retry that adds ?dedupe=true is a different request, not a replay of the first
+    retry = {**headers, "Idempotency-Key": f"bulk-{uuid.uuid4().hex}"}
+    assert client.post("/api/applications/bulk", json=items, headers=retry).json()["created"] == 3
+    response = client.post("/api/applications/bulk?dedupe=true", json=items, headers=retry)
+    assert response.status_code == 422
+    assert "idempotent-replayed" not in response.headers
+
+def test_idempotency_key_replays_post_responses():
+    """Retries with the same Idempotency-Key get the stored response without running again"""
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "retry"}).json()["token"]
+    headers = {"X-API-Key": token, "Idempotency-Key": f"create-{uuid.uuid4().hex}"}
+    body = {"user_id": user_id, "company": "Retry Co", "role_title": "Dev"}
+    first = client.post("/api/applications", json=body, headers=headers)
+    assert first.status_code == 201
+    retry = client.post("/api/applications", json=body, headers=headers)
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    
+    # Same key with another body or query string is rejected; another key executes normally (here: a copy)
+    response = client.post("/api/applications", json={**body, "notes": "changed"}, headers=headers)
+    assert response.status_code == 422
+    response = client.post("/api/applications?dedupe=true", json=body, headers=headers)
+    assert response.status_code == 422
+    response = client.post("/api/applications", json=body, headers={**headers, "Idempotency-Key": "another"})
+    assert response.status_code == 201
+    assert response.json()["id"] != first.json()["id"]
+    assert "idempotent-replayed" not in response.headers
+    
+    # A revoked key gets 401, not the stored response
+    key_id = client.get(f"/api-keys/{user_id}").json()[0]["id"]
+    assert client.delete(f"/api-keys/{key_id}").status_code == 204
+    response = client.post("/api/applications", json=body, headers=headers)
+    assert response.status_code == 401
+    assert "idempotent-replayed" not in response.headers
+
+def test_idempotency_key_not_stored_for_unauthenticated_routes():
+    """Sign-up and key creation (which returns the secret token) are never stored or replayed"""
+    from app.cache import idempotency_cache
+    
+    stored = len(idempotency_cache)
+    body = {"email": generate_unique_email(), "full_name": "No Replay"}
+    headers = {"Idempotency-Key": f"signup-{uuid.uuid4().hex}"}
+    assert client.post("/users", json=body, headers=headers).status_code == 201
+    response = client.post("/users", json=body, headers=headers)
+    assert response.status_code == 409
+    assert "idempotent-replayed" not in response.headers
+    
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    headers = {"Idempotency-Key": f"key-{uuid.uuid4().hex}"}
+    first = client.post("/api-keys", json={"user_id": user_id, "name": "once"}, headers=headers)
+    second = client.post("/api-keys", json={"user_id": user_id, "name": "once"}, headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert first.json()["token"] != second.json()["token"]
+    assert "idempotent-replayed" not in second.headers
+    assert len(idempotency_cache) == stored
+
+def test_idempotency_key_concurrent_duplicates_execute_once():
+    """Concurrent requests with one key wait for the first instead of executing twice"""
+    import asyncio
+    import httpx
+    
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "idem"}).json()["token"]
+    headers = {"X-API-Key": token, "Idempotency-Key": "create-once"}
+    body = {"user_id": user_id, "company": "Once Inc", "role_title": "Dev"}
+    
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/api/applications", json=body, headers=headers) for _ in range(5)))
+    
+    responses = asyncio.run(burst())
+    assert {r.status_code for r in responses} == {201}
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 4
+    stats = client.get(f"/api/applications/stats?user_id={user_id}", headers={"X-API-Key": token}).json()
+    assert stats["total"] == 1
+
+def test_concurrent_duplicate_signups():
+    """Concurrent sign-ups with one email: the unique index picks one winner, the rest get 409"""
+    import asyncio
+    import httpx
+    
+    user_data = {"email": generate_unique_email(), "full_name": "Racer"}
+    
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/users", json=user_data) for _ in range(5)))
+    
+    responses = asyncio.run(burst())
+    assert sorted(r.status_code for r in responses) == [201, 409, 409, 409, 409]
+    created = next(r.json() for r in responses if r.status_code == 201)
+    assert created["email"] == user_data["email"]
+    assert created["created_at"]
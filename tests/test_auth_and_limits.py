@@ -1,6 +1,8 @@
 import os
 import time
 import uuid
+import pytest
+from datetime import datetime
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -50,7 +52,7 @@ def test_api_key_flow_and_signed_call():
     assert response.json()["total"] >= 1
 
 def test_rate_limit_basic():
-    """Test that rate limiting works (disabled in test environment)"""
+    """Requests within the limit pass and report the remaining budget"""
     # Create user and key
     user_data = {"email": generate_unique_email(), "full_name": "Rate Limit Test"}
     response = client.post("/users", json=user_data)
@@ -61,12 +63,279 @@ def test_rate_limit_basic():
     assert response.status_code == 201
     token = response.json()["token"]
     
-    # Make requests to test rate limiting (should not be limited in test env)
+    # Make requests within the default limit (in-process buckets, since tests run without Redis)
     for i in range(10):
         response = client.get(
             f"/api/applications?user_id={user_id}",  # Updated to use /api prefix
             headers={"X-API-Key": token}
         )
         assert response.status_code == 200
+        assert int(response.headers["X-RateLimit-Remaining"]) < int(response.headers["X-RateLimit-Limit"])
     
-    print("Rate limiting is disabled in test environment (as expected)")
\ No newline at end of file
+    # Streamed responses carry the headers too
+    response = client.get(f"/api/applications/export?user_id={user_id}", headers={"X-API-Key": token})
+    assert response.status_code == 200
+    assert "X-RateLimit-Remaining" in response.headers
+    
+    print("Rate limit headers present on every limited route")
+
+def test_revoked_key_rejected_despite_cache(monkeypatch):
+    """Revoking a key must invalidate its cached verification immediately"""
+    user_data = {"email": generate_unique_email(), "full_name": "Revoke Test"}
+    response = client.post("/users", json=user_data)
+    user_id = response.json()["id"]
+    
+    response = client.post("/api-keys", json={"user_id": user_id, "name": "revoke-test"})
+    key = response.json()
+    token = key["token"]
+    
+    # Warm the cache, then make sure a wrong secret for the same prefix is still rejected
+    for _ in range(2):
+        response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": token})
+        assert response.status_code == 200
+    bad_token = token.rsplit(".", 1)[0] + ".wrong-secret"
+    response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": bad_token})
+    assert response.status_code == 401
+    
+    from app.config import settings
+    monkeypatch.setattr(settings, "INTERNAL_API_KEY_PREFIXES", [key["prefix"]])
+    stats = client.get("/internal/cache-stats", headers={"X-API-Key": token}).json()["api_keys"]
+    assert stats["hits"] >= 1
+    
+    # Revoke and verify the key stops working right away
+    response = client.delete(f"/api-keys/{key['id']}")
+    assert response.status_code == 204
+    response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": token})
+    assert response.status_code == 401
+
+def test_revocation_during_key_lookup_is_not_cached():
+    """A lookup that read the key before a concurrent revoke must not cache it afterwards"""
+    import asyncio
+    from app import crud
+    from app.auth import require_api_key
+    from app.cache import api_key_cache
+    from app.db import AsyncSessionLocal
+    
+    user_id = client.post("/users", json={"email": generate_unique_email()}).json()["id"]
+    key = client.post("/api-keys", json={"user_id": user_id, "name": "race"}).json()
+    
+    async def lookup_racing_revoke():
+        async with AsyncSessionLocal() as db:
+            original_get = db.get
+            
+            async def get_then_revoke(*args, **kwargs):
+                result = await original_get(*args, **kwargs)
+                # The key row was already read as active; revoke before the lookup caches it
+                async with AsyncSessionLocal() as other:
+                    await crud.deactivate_api_key(other, key_id=key["id"])
+                return result
+            
+            db.get = get_then_revoke
+            await require_api_key(x_api_key=key["token"], db=db)
+    
+    asyncio.run(lookup_racing_revoke())
+    assert api_key_cache.peek(key["prefix"]) is None
+    response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": key["token"]})
+    assert response.status_code == 401
+
+def test_revocation_is_broadcast_to_other_workers(monkeypatch):
+    """A revocation published by another worker evicts the key from this worker's cache"""
+    import asyncio
+    from app import revocations as revocations_module
+    from app.cache import api_key_cache
+    
+    class FakePubSub:
+        def __init__(self, queue):
+            self.queue = queue
+        
+        async def subscribe(self, channel):
+            assert channel == revocations_module.CHANNEL
+        
+        async def get_message(self, ignore_subscribe_messages, timeout):
+            try:
+                return await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        
+        async def aclose(self):
+            pass
+    
+    class FakeRedis:
+        def __init__(self):
+            self.queue = asyncio.Queue()
+        
+        def pubsub(self):
+            return FakePubSub(self.queue)
+        
+        async def publish(self, channel, message):
+            await self.queue.put({"type": "message", "channel": channel, "data": message})
+    
+    async def scenario():
+        fake = FakeRedis()
+        monkeypatch.setattr(revocations_module, "get_redis", lambda: fake)
+        broadcast = revocations_module.RevocationBroadcast()
+        broadcast.start()
+        await asyncio.sleep(0.05)
+        api_key_cache.set("remote-prefix", "cached")
+        # Published by some other worker: only the listener can evict it here
+        await fake.publish(revocations_module.CHANNEL, "remote-prefix")
+        await asyncio.sleep(0.05)
+        evicted = api_key_cache.peek("remote-prefix") is None
+        await broadcast.stop()
+        return evicted
+    
+    assert asyncio.run(scenario())
+
+def test_last_used_is_written_behind():
+    """Authenticated calls record last_used_at in memory until the tracker flushes"""
+    import asyncio
+    from app.last_used import last_used_tracker
+    
+    response = client.post("/users", json={"email": generate_unique_email(), "full_name": "Last Used"})
+    user_id = response.json()["id"]
+    response = client.post("/api-keys", json={"user_id": user_id, "name": "last-used"})
+    token = response.json()["token"]
+    
+    response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": token})
+    assert response.status_code == 200
+    
+    asyncio.run(last_used_tracker.flush())
+    keys = client.get(f"/api-keys/{user_id}").json()
+    assert keys[0]["last_used_at"] is not None
+    
+    # A stale timestamp flushed later (e.g. from a slower worker) never moves it backwards
+    last_used_tracker.record(keys[0]["id"], datetime(2000, 1, 1))
+    asyncio.run(last_used_tracker.flush())
+    assert client.get(f"/api-keys/{user_id}").json()[0]["last_used_at"] == keys[0]["last_used_at"]
+
+def test_rate_limit_per_key_override():
+    """Per-key limits are enforced with X-RateLimit-* headers, in-process when Redis is absent"""
+    from app.config import settings
+    
+    response = client.post("/users", json={"email": generate_unique_email(), "full_name": "Limit Override"})
+    user_id = response.json()["id"]
+    response = client.post("/api-keys", json={"user_id": user_id, "name": "limited"})
+    key = response.json()
+    
+    settings.RATE_LIMIT_OVERRIDES[key["prefix"]] = "3/60"
+    try:
+        for remaining in (2, 1, 0):
+            response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": key["token"]})
+            assert response.status_code == 200
+            assert response.headers["X-RateLimit-Limit"] == "3"
+            assert response.headers["X-RateLimit-Remaining"] == str(remaining)
+        
+        response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": key["token"]})
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+    finally:
+        settings.RATE_LIMIT_OVERRIDES.pop(key["prefix"], None)
+
+def _sign(secret, method, path, body=b"", ts=None):
+    """Build X-Timestamp/X-Signature headers for a request"""
+    import hashlib, hmac
+    ts = ts if ts is not None else int(time.time())
+    to_sign = f"{method}\n{path}\n{ts}\n".encode() + body
+    return {"X-Timestamp": str(ts), "X-Signature": hmac.new(secret.encode(), to_sign, hashlib.sha256).hexdigest()}
+
+def test_signed_requests_and_body_limit():
+    """Signed POST/GET are accepted, tampered bodies and oversized bodies are rejected"""
+    import json
+    
+    response = client.post("/users", json={"email": generate_unique_email(), "full_name": "Signed"})
+    user_id = response.json()["id"]
+    response = client.post("/api-keys", json={"user_id": user_id, "name": "signed"})
+    token = response.json()["token"]
+    secret = token.split(".", 1)[1]
+    
+    body = json.dumps({"user_id": user_id, "company": "SignedCo", "role_title": "Engineer"}).encode()
+    headers = {"X-API-Key": token, "Content-Type": "application/json", **_sign(secret, "POST", "/api/applications", body)}
+    response = client.post("/api/applications", content=body, headers=headers)
+    assert response.status_code == 201
+    
+    # Same signature over a different body fails
+    tampered = body.replace(b"SignedCo", b"OtherCo")
+    response = client.post("/api/applications", content=tampered, headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Bad signature"
+    
+    # Signed request without a body parameter
+    headers = {"X-API-Key": token, **_sign(secret, "GET", "/api/applications")}
+    response = client.get(f"/api/applications?user_id={user_id}", headers=headers)
+    assert response.status_code == 200
+    
+    # Replaying the exact signed request is rejected
+    response = client.get(f"/api/applications?user_id={user_id}", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Replayed request"
+    
+    from app.config import settings
+    too_big = b"[" + b" " * settings.MAX_REQUEST_BODY_BYTES + b"]"
+    response = client.post("/api/applications/bulk", content=too_big, headers={"X-API-Key": token})
+    assert response.status_code == 413
+    
+    # Chunked (no Content-Length) bodies are capped too, also on routes with a body model
+    def chunks():
+        yield b'{"user_id": 1, "notes": "'
+        for _ in range(settings.MAX_REQUEST_BODY_BYTES // 65536 + 1):
+            yield b"x" * 65536
+        yield b'"}'
+    
+    for path, headers in (("/api/applications", {"X-API-Key": token}), ("/users", {})):
+        response = client.post(path, content=chunks(), headers={**headers, "Content-Type": "application/json"})
+        assert response.status_code == 413, path
+        assert response.json()["detail"] == "Request body too large"
+    
+    # A small chunked body still reaches the endpoint intact
+    small = json.dumps({"email": generate_unique_email(), "full_name": "Chunked"}).encode()
+    response = client.post("/users", content=iter([small[:10], small[10:]]), headers={"Content-Type": "application/json"})
+    assert response.status_code == 201
+
+def test_legacy_key_without_secret_hash():
+    """Keys stored before secret_hash existed still authenticate via decryption"""
+    from sqlalchemy import update
+    from app.cache import api_key_cache
+    from app.db import SessionLocal
+    from app.models_apikeys import ApiKey
+    
+    response = client.post("/users", json={"email": generate_unique_email(), "full_name": "Legacy Key"})
+    user_id = response.json()["id"]
+    response = client.post("/api-keys", json={"user_id": user_id, "name": "legacy"})
+    key = response.json()
+    
+    with SessionLocal() as s:
+        s.execute(update(ApiKey).where(ApiKey.id == key["id"]).values(secret_hash=None))
+        s.commit()
+    api_key_cache.invalidate(key["prefix"])
+    
+    response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": key["token"]})
+    assert response.status_code == 200
+    bad_token = key["token"].rsplit(".", 1)[0] + ".wrong-secret"
+    api_key_cache.invalidate(key["prefix"])
+    response = client.get(f"/api/applications?user_id={user_id}", headers={"X-API-Key": bad_token})
+    assert response.status_code == 401
+
+@pytest.fixture
+def timed_client():
+    """Client behind an always-sampling ServerTimingMiddleware; SQL listeners removed afterwards"""
+    from app.db import async_engine
+    from app.timing import ServerTimingMiddleware, instrument_engine, uninstrument_engine
+    instrument_engine(async_engine.sync_engine)
+    yield TestClient(ServerTimingMiddleware(app, sample_rate=1.0))
+    uninstrument_engine(async_engine.sync_engine)
+
+def test_server_timing_breakdown(timed_client):
+    """Sampled requests report auth, rate limit and SQL phases in Server-Timing"""
+    
+    user_id = client.post("/users", json={"email": generate_unique_email(), "full_name": "Timing"}).json()["id"]
+    token = client.post("/api-keys", json={"user_id": user_id, "name": "timing"}).json()["token"]
+    
+    response = timed_client.get("/api/applications", headers={"X-API-Key": token}, params={"user_id": user_id})
+    assert response.status_code == 200
+    header = response.headers["server-timing"]
+    for name in ("auth;dur=", "signature;dur=", "ratelimit;dur=", "db;dur=", "sql1;dur=", "total;dur="):
+        assert name in header
+    
+    # Unsampled requests carry no header
+    response = client.get("/api/applications", headers={"X-API-Key": token}, params={"user_id": user_id})
+    assert "server-timing" not in response.headers
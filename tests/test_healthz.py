@@ -35,4 +35,63 @@ def test_healthz_with_debug():
     print(f"Response body: {response.text}")
     
     # This test will always pass but provides debugging info
-    assert True
\ No newline at end of file
+    assert True
+
+def test_pool_stats(monkeypatch):
+    """Pool statistics are exposed for both engines, to allowlisted keys only"""
+    import uuid
+    from app.config import settings
+    response = client.post("/users", json={"email": f"pool-{uuid.uuid4().hex[:8]}@example.com"})
+    response = client.post("/api-keys", json={"user_id": response.json()["id"], "name": "pool"})
+    token, prefix = response.json()["token"], response.json()["prefix"]
+    
+    # Any tenant's key is not enough
+    for path in ("/internal/pool", "/internal/cache-stats", "/internal/slow-queries"):
+        response = client.get(path, headers={"X-API-Key": token})
+        assert response.status_code == 403
+    
+    monkeypatch.setattr(settings, "INTERNAL_API_KEY_PREFIXES", [prefix])
+    response = client.get("/internal/pool", headers={"X-API-Key": token})
+    assert response.status_code == 200
+    data = response.json()
+    for engine in ("async", "sync"):
+        assert data[engine]["checkouts"] >= 1
+        assert data[engine]["checkout_timeouts"] == 0
+        assert sum(data[engine]["wait_ms_histogram"].values()) == data[engine]["checkouts"]
+
+def test_metrics_endpoint():
+    """Prometheus metrics expose per-route requests and auth failures"""
+    client.get("/api/applications", headers={"X-API-Key": "ak_doesnotexist.secret"})
+    client.get("/healthz")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/healthz",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{le="0.001",method="GET",route="/api/applications"}' in body
+    assert 'auth_failures_total{reason="API key not found"}' in body
+    assert "http_requests_in_flight" in body
+    assert 'db_pool_checked_out{engine="async"}' in body
+
+def test_slow_query_stats(monkeypatch):
+    """Statements are aggregated per route and exposed with N+1 flags"""
+    import uuid
+    from app.config import settings
+    response = client.post("/users", json={"email": f"sq-{uuid.uuid4().hex[:8]}@example.com"})
+    response = client.post("/api-keys", json={"user_id": response.json()["id"], "name": "sq"})
+    token = response.json()["token"]
+    monkeypatch.setattr(settings, "INTERNAL_API_KEY_PREFIXES", [response.json()["prefix"]])
+    
+    original = settings.QUERY_COUNT_WARN_THRESHOLD
+    settings.QUERY_COUNT_WARN_THRESHOLD = 0
+    try:
+        client.get("/api/applications", headers={"X-API-Key": token})
+    finally:
+        settings.QUERY_COUNT_WARN_THRESHOLD = original
+    
+    response = client.get("/internal/slow-queries", headers={"X-API-Key": token}, params={"limit": 50})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["top"] and all(e["calls"] >= 1 for e in data["top"])
+    assert any("GET /api/applications" in e["routes"] for e in data["top"])
+    assert data["n_plus_one_routes"]["GET /api/applications"]["requests"] >= 1